@@ -1 +1,2 @@
 __version__ = "0.1.0"
+default_app_config = 'js_vacancies.apps.Vacancies'
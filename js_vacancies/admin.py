@@ -18,9 +18,11 @@ from . import models
 from .constants import (
     VACANCIES_SUMMARY_RICHTEXT,
 )
+from .signals import send_vacancies_updated
 
 def make_published(modeladmin, request, queryset):
     queryset.update(is_published=True)
+    send_vacancies_updated(modeladmin, queryset)
 
 
 make_published.short_description = _(
@@ -29,6 +31,7 @@ make_published.short_description = _(
 
 def make_unpublished(modeladmin, request, queryset):
     queryset.update(is_published=False)
+    send_vacancies_updated(modeladmin, queryset)
 
 
 make_unpublished.short_description = _(
@@ -37,6 +40,7 @@ make_unpublished.short_description = _(
 
 def make_featured(modeladmin, request, queryset):
     queryset.update(is_featured=True)
+    send_vacancies_updated(modeladmin, queryset)
 
 
 make_featured.short_description = _(
@@ -45,6 +49,7 @@ make_featured.short_description = _(
 
 def make_not_featured(modeladmin, request, queryset):
     queryset.update(is_featured=False)
+    send_vacancies_updated(modeladmin, queryset)
 
 
 make_not_featured.short_description = _(
@@ -187,8 +192,8 @@ class VacanciesConfigAdmin(
         return (
             'app_title', 'permalink_type', 'non_permalink_handling',
             'template_prefix', 'paginate_by', 'pagination_pages_start',
-            'pagination_pages_visible', 'exclude_featured',
-            'search_indexed', 'config.default_published',)
+            'pagination_pages_visible', 'pagination_mode', 'feed_items',
+            'exclude_featured', 'search_indexed', 'config.default_published',)
 
 
 admin.site.register(models.VacanciesConfig, VacanciesConfigAdmin)
@@ -5,3 +5,10 @@ from django.apps import AppConfig
 class Vacancies(AppConfig):
     name = 'js_vacancies'
     verbose_name = 'Vacancies'
+
+    def ready(self):
+        from .constants import VACANCIES_FULLTEXT_BACKEND
+        if VACANCIES_FULLTEXT_BACKEND == 'memory':
+            # Reads the index snapshot, if any.
+            from .inverted_index import get_index
+            get_index()
@@ -0,0 +1,299 @@
+# -*- coding: utf-8 -*-
+"""
+Prefix index for the search-as-you-type suggestions of vacancy titles,
+categories and locations.
+
+Every (language, namespace) shard keeps a sorted array of
+``(term, kind, value)`` keys, where the terms of a label are its word
+suffixes ("senior python developer", "python developer", "developer"), so
+that a lookup is a binary search for the typed prefix followed by a short
+scan. Only published vacancies are indexed.
+
+Shards follow the cache version of their namespace: changes made in this
+process are applied incrementally once their transaction commits, anything
+else (other processes, publish transitions) triggers a rebuild in a
+background thread while the outdated shard keeps answering.
+"""
+
+from __future__ import unicode_literals
+
+import bisect
+import threading
+
+from django.db import connections
+from django.utils.encoding import force_text
+from django.utils.timezone import now
+from django.utils.translation import override
+
+from . import cache
+from .search import get_words
+from .utils import OnCommitBatch, get_vacancy_urls
+
+try:
+    from django.core.urlresolvers import NoReverseMatch, reverse
+except ImportError:
+    # Django 2.0
+    from django.urls import NoReverseMatch, reverse
+
+KINDS = ('vacancy', 'category', 'location')
+
+
+def normalize(text):
+    return ' '.join(get_words(text))
+
+
+def get_terms(label):
+    words = get_words(label)
+    return set(' '.join(words[i:]) for i in range(len(words)))
+
+
+class Shard(object):
+    """
+    The suggestions of one language and namespace.
+    """
+
+    def __init__(self, generation=None, expires=None):
+        # Cache version of the namespace the shard is up to date with.
+        self.generation = generation
+        # Next publish transition, after which the shard is outdated.
+        self.expires = expires
+        # Sorted [(term, kind, value)].
+        self.keys = []
+        # {(kind, value): (label, url)}
+        self.labels = {}
+        # {(kind, value): set of the pks of the vacancies it comes from}
+        self.owners = {}
+        # {vacancy pk: [(kind, value)]}
+        self.items = {}
+
+    def is_current(self, generation):
+        return self.generation == generation and (
+            self.expires is None or self.expires > now())
+
+    def add(self, pk, items, insert=bisect.insort):
+        """
+        Indexes the ``(kind, value, label, url)`` items of a vacancy.
+        """
+        self.remove(pk)
+        keys = []
+        for kind, value, label, url in items:
+            item = (kind, value)
+            if item not in self.owners:
+                self.owners[item] = set()
+                self.labels[item] = (label, url)
+                for term in get_terms(label):
+                    insert(self.keys, (term, kind, value))
+            self.owners[item].add(pk)
+            keys.append(item)
+        self.items[pk] = keys
+
+    def remove(self, pk):
+        for item in self.items.pop(pk, ()):
+            owners = self.owners[item]
+            owners.discard(pk)
+            if owners:
+                continue
+            del self.owners[item]
+            label, url = self.labels.pop(item)
+            for term in get_terms(label):
+                position = bisect.bisect_left(self.keys, (term, ) + item)
+                del self.keys[position]
+
+    def suggest(self, prefix, limit):
+        results = []
+        seen = set()
+        position = bisect.bisect_left(self.keys, (prefix, ))
+        while position < len(self.keys) and len(results) < limit:
+            term, kind, value = self.keys[position]
+            position += 1
+            if not term.startswith(prefix):
+                break
+            if (kind, value) in seen:
+                continue
+            seen.add((kind, value))
+            label, url = self.labels[kind, value]
+            results.append({
+                'kind': kind,
+                'value': value,
+                'label': label,
+                'url': url,
+                'count': len(self.owners[kind, value]),
+            })
+        results.sort(key=lambda result: KINDS.index(result['kind']))
+        return results
+
+
+def get_vacancies(language, namespace=None, pks=None):
+    from .models import Vacancy
+
+    vacancies = Vacancy.objects.published().active_translations(language)
+    if namespace is not None:
+        vacancies = vacancies.namespace(namespace)
+    if pks is not None:
+        vacancies = vacancies.filter(pk__in=pks)
+    return vacancies.language(language).select_related(
+        'app_config', 'location').prefetch_related('categories')
+
+
+def get_items(vacancies, language, namespace):
+    """
+    Returns the ``(pk, items)`` of ``vacancies`` in ``namespace``.
+    """
+    with override(language):
+        urls = get_vacancy_urls(vacancies, language)
+        try:
+            list_url = reverse(
+                '{0}:vacancy-list-filtered'.format(namespace))
+        except NoReverseMatch:
+            list_url = None
+        for vacancy in vacancies:
+            if vacancy.app_config.namespace != namespace:
+                continue
+            items = [(
+                'vacancy', vacancy.pk,
+                vacancy.safe_translation_getter(
+                    'title', language_code=language),
+                urls.get(vacancy.pk),
+            )]
+            for category in vacancy.categories.all():
+                slug = category.safe_translation_getter(
+                    'slug', language_code=language)
+                try:
+                    url = reverse(
+                        '{0}:vacancy-list-by-category'.format(namespace),
+                        kwargs={'category': slug})
+                except NoReverseMatch:
+                    url = None
+                items.append((
+                    'category', category.pk,
+                    category.safe_translation_getter(
+                        'name', language_code=language),
+                    url,
+                ))
+            if vacancy.location_id:
+                url = None
+                if list_url:
+                    url = '{0}?location={1}'.format(
+                        list_url, vacancy.location_id)
+                items.append((
+                    'location', vacancy.location_id,
+                    force_text(vacancy.location), url,
+                ))
+            yield vacancy.pk, [item for item in items if item[2]]
+
+
+def build_shard(language, namespace):
+    shard = Shard(
+        cache.get_version(namespace), cache.get_next_transition(namespace))
+    vacancies = get_vacancies(language, namespace)
+    for pk, items in get_items(vacancies, language, namespace):
+        shard.add(pk, items, insert=list.append)
+    shard.keys.sort()
+    return shard
+
+
+class AutocompleteIndex(object):
+
+    def __init__(self):
+        # {(language, namespace): Shard}
+        self.shards = {}
+        # {(language, namespace): rebuilding thread}
+        self.builds = {}
+        self.lock = threading.RLock()
+
+    def build(self, key):
+        try:
+            shard = build_shard(*key)
+            with self.lock:
+                self.shards[key] = shard
+        finally:
+            with self.lock:
+                del self.builds[key]
+            # The thread's own database connections.
+            connections.close_all()
+
+    def get_shard(self, language, namespace, budget):
+        """
+        Returns the shard, rebuilding it in the background if it is out of
+        date. Waits up to ``budget`` seconds if there is no shard at all,
+        then gives up and returns None.
+        """
+        key = (language, namespace)
+        generation = cache.get_version(namespace)
+        with self.lock:
+            shard = self.shards.get(key)
+            if shard is not None and shard.is_current(generation):
+                return shard
+            thread = self.builds.get(key)
+            if thread is None:
+                thread = threading.Thread(target=self.build, args=(key, ))
+                thread.daemon = True
+                self.builds[key] = thread
+                thread.start()
+        if shard is None:
+            thread.join(budget)
+            shard = self.shards.get(key)
+        return shard
+
+    def suggest(self, query, language, namespace, limit, budget):
+        prefix = normalize(query)
+        if not prefix:
+            return []
+        shard = self.get_shard(language, namespace, budget)
+        if shard is None:
+            return []
+        with self.lock:
+            return shard.suggest(prefix, limit)
+
+    def update(self, pks):
+        """
+        Reindexes the given vacancies in the shards which are loaded.
+        """
+        with self.lock:
+            keys = list(self.shards)
+        for language in set(language for language, namespace in keys):
+            vacancies = list(get_vacancies(language, pks=pks))
+            for namespace in [namespace for key_language, namespace in keys
+                              if key_language == language]:
+                items = dict(get_items(vacancies, language, namespace))
+                with self.lock:
+                    shard = self.shards.get((language, namespace))
+                    if shard is None:
+                        continue
+                    for pk in pks:
+                        if pk in items:
+                            shard.add(pk, items[pk])
+                        else:
+                            shard.remove(pk)
+
+    def invalidated(self, versions):
+        """
+        Moves the shards which were up to date along with the cache version
+        bumps of this process (``{namespace: new version}``), whose changes
+        are reindexed by ``update()``. Shards another process bumped in
+        between are left behind, to be rebuilt.
+        """
+        with self.lock:
+            for (language, namespace), shard in self.shards.items():
+                version = versions.get(namespace)
+                if version is not None and shard.generation == version - 1:
+                    shard.generation = version
+
+
+_index = AutocompleteIndex()
+
+
+def get_index():
+    return _index
+
+
+def update_many(pks):
+    _index.update(pks)
+
+
+def invalidated(versions):
+    _index.invalidated(versions)
+
+
+# Collects the vacancies to reindex until the transaction commits.
+pending_updates = OnCommitBatch(update_many)
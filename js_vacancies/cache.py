@@ -0,0 +1,155 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import unicode_literals
+
+import hashlib
+import math
+
+from django.core.cache import caches
+from django.utils.encoding import force_bytes
+from django.utils.timezone import now
+
+from .constants import (
+    VACANCIES_CACHE_ALIAS,
+    VACANCIES_CACHE_PREFIX,
+    VACANCIES_CACHE_TIMEOUT,
+)
+from .signals import cache_invalidated
+
+# Version shared by every namespace, bumped on any vacancy change.
+GLOBAL_NAMESPACE = '*'
+
+
+def get_cache():
+    return caches[VACANCIES_CACHE_ALIAS]
+
+
+def _version_key(namespace):
+    return '{0}:version:{1}'.format(
+        VACANCIES_CACHE_PREFIX, namespace or GLOBAL_NAMESPACE)
+
+
+def get_version(namespace=None):
+    """
+    Returns the current cache generation for the given namespace. Every
+    cached value is stored under a key which includes this number, so bumping
+    it invalidates all cached values of the namespace at once.
+    """
+    cache = get_cache()
+    key = _version_key(namespace)
+    version = cache.get(key)
+    if version is None:
+        version = 1
+        cache.add(key, version, None)
+    return version
+
+
+def bump_version(namespace=None):
+    """
+    Bumps the cache generation of the namespace and returns the new one.
+    """
+    cache = get_cache()
+    key = _version_key(namespace)
+    try:
+        return cache.incr(key)
+    except ValueError:
+        cache.set(key, 2, None)
+        return 2
+
+
+def invalidate(namespaces=()):
+    """
+    Invalidates everything cached for the given namespaces, and everything
+    cached across namespaces. Sends ``cache_invalidated`` with the new
+    versions.
+    """
+    changed = now()
+    cache = get_cache()
+    versions = {}
+    for namespace in set(namespaces):
+        if namespace:
+            versions[namespace] = bump_version(namespace)
+            cache.set(_changed_key(namespace), changed, None)
+    versions[None] = bump_version(None)
+    cache.set(_changed_key(None), changed, None)
+    cache_invalidated.send(sender=None, versions=versions)
+
+
+def _changed_key(namespace):
+    return '{0}:changed:{1}'.format(
+        VACANCIES_CACHE_PREFIX, namespace or GLOBAL_NAMESPACE)
+
+
+def get_last_change(namespace=None):
+    """
+    Returns when the vacancies of the namespace were last changed or
+    deleted, if known.
+    """
+    return get_cache().get(_changed_key(namespace))
+
+
+def make_key(name, namespace=None, *parts):
+    """
+    Builds a versioned cache key for ``name`` in ``namespace``. When no
+    namespace is given, the key is tied to the global version.
+    """
+    bits = [namespace or GLOBAL_NAMESPACE, get_version(namespace)]
+    bits.extend(parts)
+    digest = hashlib.md5(
+        force_bytes(':'.join('{0}'.format(bit) for bit in bits))).hexdigest()
+    return '{0}:{1}:{2}'.format(VACANCIES_CACHE_PREFIX, name, digest)
+
+
+def get_next_transition(namespace=None):
+    """
+    Returns the (cached) next moment at which the published vacancies of
+    the namespace change by themselves, see
+    ``RelatedManager.get_next_transition``.
+    """
+    from .models import Vacancy
+
+    cache = get_cache()
+    key = make_key('transition', namespace)
+    value = cache.get(key)
+    if value is None:
+        transition = Vacancy.objects.get_next_transition(namespace)
+        # Wrapped in a tuple, so that "no transition" can be cached too.
+        value = (transition, )
+        cache.set(key, value, _until(transition, VACANCIES_CACHE_TIMEOUT))
+    return value[0]
+
+
+def _until(moment, timeout):
+    """
+    Returns ``timeout`` (None meaning forever), shortened to end at
+    ``moment`` if that comes first.
+    """
+    if moment is None:
+        return timeout
+    remaining = max(1, int(math.ceil((moment - now()).total_seconds())))
+    if timeout is None:
+        return remaining
+    return min(timeout, remaining)
+
+
+def get_timeout(namespace=None, timeout=None):
+    """
+    Returns the timeout for values depending on the published vacancies of
+    the namespace: ``timeout`` (or the default timeout), but never past the
+    next publish transition.
+    """
+    if timeout is None:
+        timeout = VACANCIES_CACHE_TIMEOUT
+    return _until(get_next_transition(namespace), timeout)
+
+
+def get_cached(key, default=None):
+    return get_cache().get(key, default)
+
+
+def set_cached(key, value, namespace=None, timeout=None):
+    """
+    Caches ``value`` until it expires or the published vacancies of the
+    namespace change, whichever comes first.
+    """
+    get_cache().set(key, value, get_timeout(namespace, timeout))
@@ -28,6 +28,11 @@ NON_PERMALINK_HANDLING = (
     (404, _('Return 404: Not Found')),
 )
 
+PAGINATION_MODES = (
+    ('pages', _('Numbered pages')),
+    ('cursor', _('Previous/next only (fast for large lists)')),
+)
+
 # TODO override default if support for Django 1.6 will be dropped
 TEMPLATE_PREFIX_CHOICES = getattr(
     settings, 'VACANCIES_TEMPLATE_PREFIXES', [])
@@ -72,6 +77,22 @@ class VacanciesConfig(TranslatableModel, AppHookConfig):
         help_text=_('When grouping page numbers, this determines how many '
                     'pages are visible on each side of the active page.'),
     )
+    pagination_mode = models.CharField(
+        _('Pagination mode'),
+        max_length=10,
+        blank=False,
+        default='pages',
+        choices=PAGINATION_MODES,
+        help_text=_('Numbered pages need to count all vacancies and get '
+                    'slower the deeper the page; previous/next pagination '
+                    'costs the same on every page.'),
+    )
+    feed_items = models.PositiveSmallIntegerField(
+        _('Feed size'),
+        blank=False,
+        default=10,
+        help_text=_('How many of the latest vacancies do the feeds list?'),
+    )
     exclude_featured = models.PositiveSmallIntegerField(
         _('Excluded featured vacancies count'),
         blank=True,
@@ -2,7 +2,6 @@
 
 from __future__ import unicode_literals
 
-from django.core.urlresolvers import NoReverseMatch
 from django.utils.translation import (
     get_language_from_request,
     ugettext_lazy as _,
@@ -13,7 +12,10 @@ from cms.apphook_pool import apphook_pool
 from menus.base import NavigationNode
 from menus.menu_pool import menu_pool
 
+from . import cache
+from .constants import VACANCIES_MENU_LIMIT, VACANCIES_MENU_ORDERING
 from .models import Vacancy
+from .utils import get_vacancy_urls
 
 
 class VacanciesMenu(CMSAttachMenu):
@@ -21,33 +23,54 @@ class VacanciesMenu(CMSAttachMenu):
 
     def get_queryset(self, request):
         """Returns base queryset with support for preview-mode."""
-        queryset = Vacancy.objects
-        if not (request.toolbar and request.toolbar.edit_mode):
+        queryset = Vacancy.objects.for_urls()
+        if not self.is_edit_mode(request):
             queryset = queryset.published()
         return queryset
 
+    def is_edit_mode(self, request):
+        return bool(request.toolbar and request.toolbar.edit_mode)
+
+    def get_config(self):
+        if hasattr(self, 'instance') and self.instance:
+            app = apphook_pool.get_apphook(self.instance.application_urls)
+            return app.get_config(self.instance.application_namespace)
+        return None
+
     def get_nodes(self, request):
-        nodes = []
+        """
+        Returns a node per vacancy, at most VACANCIES_MENU_LIMIT. The nodes
+        are cached per namespace, language and edit mode until the vacancies
+        of the namespace change.
+        """
         language = get_language_from_request(request, check_path=True)
+        config = self.get_config()
+        namespace = config.namespace if config else None
+        key = cache.make_key(
+            'menu', namespace, language, self.is_edit_mode(request))
+        items = cache.get_cached(key)
+        if items is None:
+            items = self.get_items(request, language, config)
+            cache.set_cached(key, items, namespace=namespace)
+        return [NavigationNode(title, url, pk) for title, url, pk in items]
+
+    def get_items(self, request, language, config):
+        """
+        Returns the (title, url, pk) of the vacancies in the menu.
+        """
         vacancies = self.get_queryset(request).active_translations(language)
+        if config:
+            vacancies = vacancies.filter(app_config=config)
+        vacancies = vacancies.order_by(*VACANCIES_MENU_ORDERING)
+        if VACANCIES_MENU_LIMIT:
+            vacancies = vacancies[:VACANCIES_MENU_LIMIT]
+        vacancies = list(vacancies)
 
-        if hasattr(self, 'instance') and self.instance:
-            app = apphook_pool.get_apphook(self.instance.application_urls)
-            config = app.get_config(self.instance.application_namespace)
-            if config:
-                vacancies = vacancies.filter(app_config=config)
-
-        for vacancy in vacancies:
-            try:
-                url = vacancy.get_absolute_url(language=language)
-            except NoReverseMatch:
-                url = None
-
-            if url:
-                node = NavigationNode(vacancy.safe_translation_getter(
-                    'title', language_code=language), url, vacancy.pk)
-                nodes.append(node)
-        return nodes
+        urls = get_vacancy_urls(vacancies, language)
+        return [
+            (vacancy.safe_translation_getter('title', language_code=language),
+             urls[vacancy.pk], vacancy.pk)
+            for vacancy in vacancies if vacancy.pk in urls]
 
 
 menu_pool.register_menu(VacanciesMenu)
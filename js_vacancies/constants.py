@@ -7,3 +7,204 @@ VACANCIES_SUMMARY_RICHTEXT = getattr(
     'VACANCIES_SUMMARY_RICHTEXT',
     False,
 )
+
+# Name of the cache (from settings.CACHES) used by the addon.
+VACANCIES_CACHE_ALIAS = getattr(
+    settings,
+    'VACANCIES_CACHE_ALIAS',
+    'default',
+)
+
+# Prefix for every cache key written by the addon.
+VACANCIES_CACHE_PREFIX = getattr(
+    settings,
+    'VACANCIES_CACHE_PREFIX',
+    'js_vacancies',
+)
+
+# Default timeout, in seconds, for cached querysets and fragments.
+VACANCIES_CACHE_TIMEOUT = getattr(
+    settings,
+    'VACANCIES_CACHE_TIMEOUT',
+    60 * 60,
+)
+
+# How many related vacancies are stored for each vacancy.
+VACANCIES_RELATED_COUNT = getattr(
+    settings,
+    'VACANCIES_RELATED_COUNT',
+    10,
+)
+
+# Weight of each shared link when scoring related vacancies.
+VACANCIES_RELATED_WEIGHTS = getattr(
+    settings,
+    'VACANCIES_RELATED_WEIGHTS',
+    {
+        'categories': 1,
+        'services': 1,
+        'companies': 1,
+    },
+)
+
+# Lists estimated (by the database planner) to hold more vacancies than this
+# are paginated with the estimate rather than an exact count. Only supported
+# on PostgreSQL; None always counts exactly.
+VACANCIES_APPROXIMATE_COUNT_THRESHOLD = getattr(
+    settings,
+    'VACANCIES_APPROXIMATE_COUNT_THRESHOLD',
+    None,
+)
+
+# Cache the rendered responses of the public (anonymous, non-edit-mode)
+# vacancy views. Other content of the pages, e.g. menus and static
+# placeholders, can be stale for up to VACANCIES_CACHE_RESPONSES_TIMEOUT.
+VACANCIES_CACHE_RESPONSES = getattr(
+    settings,
+    'VACANCIES_CACHE_RESPONSES',
+    False,
+)
+
+VACANCIES_CACHE_RESPONSES_TIMEOUT = getattr(
+    settings,
+    'VACANCIES_CACHE_RESPONSES_TIMEOUT',
+    5 * 60,
+)
+
+# Full-text search backend used by the search view: 'auto', 'postgresql',
+# 'sqlite' or 'simple'. See js_vacancies.search.
+VACANCIES_FULLTEXT_BACKEND = getattr(
+    settings,
+    'VACANCIES_FULLTEXT_BACKEND',
+    'auto',
+)
+
+# PostgreSQL text search configuration (i.e. stemmer) for each language.
+# Languages which are not listed use the 'simple' configuration.
+VACANCIES_FULLTEXT_CONFIGS = getattr(
+    settings,
+    'VACANCIES_FULLTEXT_CONFIGS',
+    {
+        'da': 'danish',
+        'de': 'german',
+        'en': 'english',
+        'es': 'spanish',
+        'fi': 'finnish',
+        'fr': 'french',
+        'hu': 'hungarian',
+        'it': 'italian',
+        'nl': 'dutch',
+        'no': 'norwegian',
+        'pt': 'portuguese',
+        'ro': 'romanian',
+        'ru': 'russian',
+        'sv': 'swedish',
+        'tr': 'turkish',
+    },
+)
+
+# Maximum number of search results.
+VACANCIES_SEARCH_MAX_RESULTS = getattr(
+    settings,
+    'VACANCIES_SEARCH_MAX_RESULTS',
+    500,
+)
+
+# Maximum size of the in-process search index (backend 'memory'), in
+# postings (distinct words per vacancy translation); roughly 100 bytes each.
+VACANCIES_MEMORY_INDEX_MAX_POSTINGS = getattr(
+    settings,
+    'VACANCIES_MEMORY_INDEX_MAX_POSTINGS',
+    2000000,
+)
+
+# File the in-process search index is saved to and restored from at
+# startup. None disables snapshots.
+VACANCIES_MEMORY_INDEX_SNAPSHOT = getattr(
+    settings,
+    'VACANCIES_MEMORY_INDEX_SNAPSHOT',
+    None,
+)
+
+# Maximum number of autocomplete suggestions.
+VACANCIES_AUTOCOMPLETE_LIMIT = getattr(
+    settings,
+    'VACANCIES_AUTOCOMPLETE_LIMIT',
+    10,
+)
+
+# Time in seconds an autocomplete request may wait for the suggestions of
+# its namespace to be indexed. Slower requests get no suggestions.
+VACANCIES_AUTOCOMPLETE_BUDGET = getattr(
+    settings,
+    'VACANCIES_AUTOCOMPLETE_BUDGET',
+    0.05,
+)
+
+# Rebuild the search_data of vacancies whose plugins changed in a background
+# thread instead of once the transaction commits, so that editors do not
+# wait for it.
+VACANCIES_SEARCH_DATA_IN_BACKGROUND = getattr(
+    settings,
+    'VACANCIES_SEARCH_DATA_IN_BACKGROUND',
+    False,
+)
+
+# Number of search results (per query, namespace and language) cached in
+# each process. 0 disables the cache.
+VACANCIES_SEARCH_CACHE_SIZE = getattr(
+    settings,
+    'VACANCIES_SEARCH_CACHE_SIZE',
+    1000,
+)
+
+# Maximum number of URLs (one per vacancy and translation) per sitemap page.
+# The sitemap protocol allows 50000 URLs and 50 MB per file, and every URL
+# lists the other translations as alternates.
+VACANCIES_SITEMAP_LIMIT = getattr(
+    settings,
+    'VACANCIES_SITEMAP_LIMIT',
+    10000,
+)
+
+# Directory the generate_vacancy_static_files command writes the sitemaps
+# and feeds to, and URL (path or absolute) it is served at.
+VACANCIES_STATIC_FILES_DIR = getattr(
+    settings,
+    'VACANCIES_STATIC_FILES_DIR',
+    None,
+)
+VACANCIES_STATIC_FILES_URL = getattr(
+    settings,
+    'VACANCIES_STATIC_FILES_URL',
+    '/',
+)
+
+# Also write gzipped copies of the static files.
+VACANCIES_STATIC_FILES_GZIP = getattr(
+    settings,
+    'VACANCIES_STATIC_FILES_GZIP',
+    False,
+)
+
+# Regenerate the static files (in a background thread) whenever vacancies
+# are saved or changed in bulk. Requires VACANCIES_STATIC_FILES_DIR.
+VACANCIES_STATIC_FILES_ON_PUBLISH = getattr(
+    settings,
+    'VACANCIES_STATIC_FILES_ON_PUBLISH',
+    False,
+)
+
+# Maximum number of vacancies in the menu of a section, None for all.
+VACANCIES_MENU_LIMIT = getattr(
+    settings,
+    'VACANCIES_MENU_LIMIT',
+    None,
+)
+
+# Order of the vacancies in the menu (and which are kept with a limit).
+VACANCIES_MENU_ORDERING = getattr(
+    settings,
+    'VACANCIES_MENU_ORDERING',
+    ('-publishing_date', '-pk'),
+)
@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+"""
+Bulk exports of the published vacancies of a namespace, for syndication to
+job boards.
+
+The vacancies are read in chunks ordered by pk (keyset iteration, with the
+related objects prefetched per chunk) and rendered one at a time, so that
+memory stays flat however many vacancies there are. Both formats are
+generators of text, suitable for a ``StreamingHttpResponse`` or a file.
+"""
+
+from __future__ import unicode_literals
+
+import json
+from xml.sax.saxutils import escape
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils.encoding import force_text
+from django.utils.timezone import now
+from django.utils.translation import override
+
+from .utils import get_vacancy_urls
+
+FORMATS = ('jsonl', 'xml')
+
+CONTENT_TYPES = {
+    'jsonl': 'application/x-ndjson; charset=utf-8',
+    'xml': 'application/xml; charset=utf-8',
+}
+
+CHUNK_SIZE = 500
+
+
+def iter_vacancies(namespace, language, chunk_size=CHUNK_SIZE):
+    """
+    Yields the open, published vacancies of ``namespace`` translated in
+    ``language`` along with their URL (path).
+    """
+    from .models import Vacancy
+
+    vacancies = Vacancy.objects.published().open().namespace(
+        namespace).active_translations(language).language(
+        language).for_listing().order_by('pk')
+    last = 0
+    while True:
+        chunk = list(vacancies.filter(pk__gt=last)[:chunk_size])
+        if not chunk:
+            return
+        urls = get_vacancy_urls(chunk, language)
+        for vacancy in chunk:
+            yield vacancy, urls.get(vacancy.pk)
+        last = chunk[-1].pk
+
+
+def get_vacancy_data(vacancy, url, language):
+    def get(field):
+        return vacancy.safe_translation_getter(field, language_code=language)
+
+    return {
+        'id': vacancy.pk,
+        'title': get('title'),
+        'slug': get('slug'),
+        'lead_in': get('lead_in'),
+        'url': url,
+        'type': vacancy.vacancy_type,
+        'location': (
+            force_text(vacancy.location) if vacancy.location_id else None),
+        'categories': [name for name in (
+            category.safe_translation_getter('name', language_code=language)
+            for category in vacancy.categories.all()) if name],
+        'companies': [
+            force_text(company) for company in vacancy.companies.all()],
+        'services': [
+            force_text(service) for service in vacancy.services.all()],
+        'external_link': vacancy.external_link,
+        'publishing_date': vacancy.publishing_date,
+        'closing_date': vacancy.closing_date,
+        'modified': vacancy.modified,
+    }
+
+
+def export_jsonl(namespace, language, base_url=''):
+    """
+    Yields one JSON object per vacancy and line.
+    """
+    with override(language):
+        for vacancy, url in iter_vacancies(namespace, language):
+            if url:
+                url = base_url + url
+            data = get_vacancy_data(vacancy, url, language)
+            yield json.dumps(data, cls=DjangoJSONEncoder) + '\n'
+
+
+def xml_element(name, value):
+    if value is None:
+        return '<{0}/>'.format(name)
+    if hasattr(value, 'isoformat'):
+        value = value.isoformat()
+    return '<{0}>{1}</{0}>'.format(name, escape(force_text(value)))
+
+
+def export_xml(namespace, language, base_url='', publisher=''):
+    """
+    Yields the vacancies as a job-board XML feed, one ``<job>`` per
+    vacancy and line.
+    """
+    yield '<?xml version="1.0" encoding="utf-8"?>\n<source>\n'
+    yield '{0}{1}\n'.format(
+        xml_element('publisher', publisher),
+        xml_element('lastBuildDate', now()))
+    with override(language):
+        for vacancy, url in iter_vacancies(namespace, language):
+            if url:
+                url = base_url + url
+            data = get_vacancy_data(vacancy, url, language)
+            yield '<job>{0}</job>\n'.format(''.join([
+                xml_element('referencenumber', data['id']),
+                xml_element('title', data['title']),
+                xml_element('url', data['url']),
+                xml_element('date', data['publishing_date']),
+                xml_element('expirationdate', data['closing_date']),
+                xml_element('description', data['lead_in']),
+                xml_element('jobtype', data['type']),
+                xml_element('city', data['location']),
+                xml_element('company', ', '.join(data['companies'])),
+                xml_element('category', ', '.join(data['categories'])),
+                xml_element('applyurl', data['external_link'] or None),
+            ]))
+    yield '</source>\n'
+
+
+def export(format, namespace, language, base_url='', publisher=''):
+    if format == 'xml':
+        return export_xml(namespace, language, base_url, publisher)
+    return export_jsonl(namespace, language, base_url)
@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+"""
+Faceted filtering of vacancy lists.
+
+Facets are selected with query string parameters, e.g.
+``?location=3&location=5&service=2&type=Full-time&closing_after=2019-06-01``.
+Values of the same facet are ORed, different facets are ANDed.
+"""
+
+from __future__ import unicode_literals
+
+from django.db.models import CharField, Count, Q, Value
+from django.db.models.functions import Cast
+from django.utils.dateparse import parse_date
+from django.utils.encoding import force_text
+from django.utils.translation import ugettext_lazy as _
+
+# (query parameter, Vacancy field, label)
+FACETS = (
+    ('location', 'location', _('Location')),
+    ('type', 'vacancy_type', _('Type')),
+    ('service', 'services', _('Service')),
+    ('company', 'companies', _('Company')),
+)
+
+# Filters vacancies which are still open at the given date.
+CLOSING_PARAM = 'closing_after'
+
+
+def get_field(model, field_name):
+    return model._meta.get_field(field_name)
+
+
+def get_facet_filters(data):
+    """
+    Returns a {parameter: [values]} dictionary with the valid facet values
+    selected in ``data`` (a QueryDict).
+    """
+    from .models import Vacancy
+
+    filters = {}
+    for name, field_name, label in FACETS:
+        values = set(value for value in data.getlist(name) if value)
+        if get_field(Vacancy, field_name).is_relation:
+            values = set(value for value in values if value.isdigit())
+        if values:
+            filters[name] = sorted(values)
+    try:
+        closing = parse_date(data.get(CLOSING_PARAM) or '')
+    except ValueError:
+        closing = None
+    if closing:
+        filters[CLOSING_PARAM] = [closing.isoformat()]
+    return filters
+
+
+def filter_queryset(queryset, filters, exclude=None):
+    """
+    Applies the facet filters, except the one of the ``exclude`` facet.
+    Many-to-many facets are filtered with a subquery on their through
+    table, so that a vacancy matching several values is listed once.
+    """
+    for name, field_name, label in FACETS:
+        if name != exclude and name in filters:
+            field = get_field(queryset.model, field_name)
+            if field.many_to_many:
+                through = field.remote_field.through
+                queryset = queryset.filter(pk__in=through.objects.filter(**{
+                    '{0}__in'.format(field.m2m_reverse_field_name()):
+                        filters[name],
+                }).values(field.m2m_field_name()))
+            else:
+                queryset = queryset.filter(
+                    **{'{0}__in'.format(field_name): filters[name]})
+    if CLOSING_PARAM in filters:
+        queryset = queryset.filter(
+            Q(closing_date__gte=filters[CLOSING_PARAM][0]) |
+            Q(closing_date__isnull=True))
+    return queryset
+
+
+def get_facet_counts(queryset, filters):
+    """
+    Returns a list of facets with the number of vacancies in ``queryset``
+    for each of their values:
+
+        [{'name': 'location', 'label': 'Location', 'options': [
+            {'value': '3', 'label': 'London', 'count': 12}, ...]}, ...]
+
+    The count of a facet value takes all other selected facets into account,
+    but not the other values of the same facet. All counts are computed by a
+    single query.
+    """
+    model = queryset.model
+    base = model._default_manager.filter(
+        pk__in=queryset.order_by().values('pk'))
+    counts = None
+    for name, field_name, label in FACETS:
+        field = get_field(model, field_name)
+        value = field_name
+        if field.is_relation:
+            value = '{0}__pk'.format(field_name)
+        part = filter_queryset(base, filters, exclude=name).order_by().annotate(
+            facet=Value(name, output_field=CharField()),
+            value=Cast(value, CharField()),
+        ).values('facet', 'value').annotate(count=Count('pk', distinct=True))
+        counts = part if counts is None else counts.union(part, all=True)
+
+    values = dict((name, {}) for name, field_name, label in FACETS)
+    for row in counts:
+        if row['value']:
+            values[row['facet']][force_text(row['value'])] = row['count']
+
+    facets = []
+    for name, field_name, label in FACETS:
+        labels = get_value_labels(get_field(model, field_name), values[name])
+        options = [
+            {'value': value, 'label': labels[value], 'count': count}
+            for value, count in values[name].items() if value in labels]
+        options.sort(key=lambda option: (-option['count'],
+                                         force_text(option['label'])))
+        facets.append({
+            'name': name, 'label': force_text(label), 'options': options})
+    return facets
+
+
+def get_value_labels(field, values):
+    if not field.is_relation:
+        return dict((value, value) for value in values)
+    objects = field.related_model._default_manager.in_bulk(
+        [int(value) for value in values])
+    return dict(
+        (force_text(pk), force_text(obj)) for pk, obj in objects.items())
+
+
+def mark_selected(facets, filters):
+    """
+    Returns a copy of ``facets`` with the options selected in ``filters``
+    flagged as such.
+    """
+    marked = []
+    for facet in facets:
+        selected = filters.get(facet['name'], [])
+        marked.append(dict(facet, options=[
+            dict(option, selected=option['value'] in selected)
+            for option in facet['options']]))
+    return marked
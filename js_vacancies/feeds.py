@@ -1,6 +1,5 @@
 # -*- coding: utf-8 -*-
 
-from django.contrib.sites.models import Site
 from django.contrib.syndication.views import Feed
 try:
     from django.contrib.sites.shortcuts import get_current_site
@@ -8,42 +7,78 @@ except ImportError:
     # Django 1.6
     from django.contrib.sites.models import get_current_site
 from django.core.urlresolvers import reverse
+from django.http import HttpResponse
 from django.utils.translation import get_language_from_request, ugettext as _
 
 from aldryn_apphooks_config.utils import get_app_instance
 from aldryn_categories.models import Category
 from aldryn_newsblog.utils.utilities import get_valid_languages
+from . import cache
 from .models import Vacancy
+from .utils import get_not_modified_response, get_validators, set_validators
 
 
 class LatestVacanciesFeed(Feed):
+    """
+    The latest published vacancies of a section. The rendered feed is
+    cached per namespace, language and URL (category) until the published
+    vacancies of the namespace change.
+    """
 
     def __call__(self, request, *args, **kwargs):
         self.namespace, self.config = get_app_instance(request)
         language = get_language_from_request(request)
-        site_id = getattr(get_current_site(request), 'id', None)
+        site = get_current_site(request)
+        self.site_name = site.name
+
+        # Feeds contain absolute URLs, built from the host and scheme.
+        key = cache.make_key(
+            'feed', self.namespace, language, request.get_host(),
+            request.is_secure(), request.get_full_path())
+        cached = cache.get_cached(key)
+        if cached is not None:
+            content, content_type, etag, timestamp = cached
+            response = HttpResponse(content, content_type=content_type)
+            set_validators(response, etag, timestamp)
+            return get_not_modified_response(
+                request, etag, timestamp, response=response)
+
         self.valid_languages = get_valid_languages(
             self.namespace,
             language_code=language,
-            site_id=site_id)
-        return super(LatestVacanciesFeed, self).__call__(
-            request, *args, **kwargs)
+            site_id=getattr(site, 'id', None))
+        etag, timestamp = get_validators(
+            self.namespace, self.get_queryset().last_modified(),
+            request.get_full_path(), language)
+        response = get_not_modified_response(request, etag, timestamp)
+        if response is None:
+            response = super(LatestVacanciesFeed, self).__call__(
+                request, *args, **kwargs)
+            if response.status_code == 200:
+                cache.set_cached(key, (
+                    response.content, response['Content-Type'],
+                    etag, timestamp,
+                ), namespace=self.namespace)
+        return set_validators(response, etag, timestamp)
 
     def link(self):
         return reverse('{0}:vacancy-list-feed'.format(self.namespace))
 
     def title(self):
-        msgformat = {'site_name': Site.objects.get_current().name}
+        msgformat = {'site_name': self.site_name}
         return _('Vacancies on %(site_name)s') % msgformat
 
     def get_queryset(self):
         qs = Vacancy.objects.published().namespace(self.namespace).translated(
             *self.valid_languages)
-        return qs
+        return qs.for_listing()
+
+    def get_item_count(self):
+        return self.config.feed_items
 
     def items(self, obj):
         qs = self.get_queryset()
-        return qs.order_by('-publishing_date')[:10]
+        return qs.order_by('-publishing_date')[:self.get_item_count()]
 
     def item_title(self, item):
         return item.title
@@ -63,4 +98,5 @@ class CategoryFeed(LatestVacanciesFeed):
             *self.valid_languages, slug=category).get()
 
     def items(self, obj):
-        return self.get_queryset().filter(categories=obj)[:10]
+        return self.get_queryset().filter(
+            categories=obj)[:self.get_item_count()]
@@ -0,0 +1,397 @@
+# -*- coding: utf-8 -*-
+"""
+An in-process inverted index of vacancy translations with BM25 ranking,
+for single-node installs without Haystack (``VACANCIES_FULLTEXT_BACKEND =
+'memory'``).
+
+The index is sharded per (language, namespace). A shard is built from the
+database the first time it is searched. Vacancies saved, deleted or updated
+in bulk in this process are reindexed in the loaded shards once the
+transaction commits, and the shards keep up with the cache version bumps of
+those changes; a shard is only rebuilt when another process changed the
+vacancies of its namespace. Shards are evicted, least recently used first,
+to stay within ``VACANCIES_MEMORY_INDEX_MAX_POSTINGS``; a shard which does
+not fit at all is not kept, and searches fall back to the database.
+Shards also know from when their vacancies are published, so that searching
+the published vacancies of a namespace needs no query at all. Shards are
+built outside of the index lock, while the outdated one keeps answering.
+
+All shards are written to a compact snapshot file
+(``VACANCIES_MEMORY_INDEX_SNAPSHOT``) in a background thread, and read at
+startup. Each snapshot shard is checked against the database before it is
+used.
+"""
+
+from __future__ import unicode_literals
+
+import heapq
+import json
+import math
+import os
+import threading
+import zlib
+from collections import Counter, OrderedDict
+
+from django.db.models import Case, Count, IntegerField, Max, Sum, When
+from django.utils.dateparse import parse_datetime
+from django.utils.encoding import force_text
+from django.utils.html import strip_tags
+from django.utils.timezone import now
+
+from . import cache
+from .constants import (
+    VACANCIES_MEMORY_INDEX_MAX_POSTINGS,
+    VACANCIES_MEMORY_INDEX_SNAPSHOT,
+)
+from .search import get_translation_model, get_words
+from .utils import BackgroundQueue, OnCommitBatch, write_atomically
+
+# BM25 parameters.
+K1 = 1.2
+B = 0.75
+
+
+def get_published(is_published, publishing_date):
+    """
+    Returns from when a vacancy is published, or None if it is not.
+    """
+    return publishing_date if is_published else None
+
+
+def get_terms(title, lead_in, search_data):
+    # The title is counted twice, so that it weighs more than the content.
+    words = get_words(title or '') * 2
+    words.extend(get_words(strip_tags(lead_in or '')))
+    words.extend(get_words(search_data or ''))
+    return words
+
+
+class Shard(object):
+    """
+    The index of the vacancies of one language and namespace.
+    """
+
+    def __init__(self, generation=None, signature=None):
+        # Cache version of the namespace the shard is up to date with.
+        self.generation = generation
+        # (count, last modified) of the indexed vacancies, used to validate
+        # shards loaded from a snapshot.
+        self.signature = signature
+        # {term: {pk: term frequency}}
+        self.postings = {}
+        # {pk: {term: term frequency}}
+        self.documents = {}
+        # {pk: number of terms}
+        self.lengths = {}
+        # {pk: publishing date} of the published vacancies.
+        self.published = {}
+        self.total_length = 0
+        self.size = 0
+
+    def add(self, pk, terms, published=None):
+        self.remove(pk)
+        if published is not None:
+            self.published[pk] = published
+        frequencies = Counter(terms)
+        self.documents[pk] = dict(frequencies)
+        self.lengths[pk] = len(terms)
+        for term, frequency in frequencies.items():
+            self.postings.setdefault(term, {})[pk] = frequency
+        self.total_length += len(terms)
+        self.size += len(frequencies)
+
+    def remove(self, pk):
+        self.published.pop(pk, None)
+        frequencies = self.documents.pop(pk, None)
+        if frequencies is None:
+            return
+        for term in frequencies:
+            postings = self.postings[term]
+            del postings[pk]
+            if not postings:
+                del self.postings[term]
+        self.total_length -= self.lengths.pop(pk)
+        self.size -= len(frequencies)
+
+    def search(self, words, limit, allowed=None, published_at=None):
+        """
+        Returns the pks of the documents matching any of the words, ranked
+        by BM25. Only documents among ``allowed`` or, with
+        ``published_at``, published at that moment are returned.
+        """
+        count = len(self.documents)
+        if not count:
+            return []
+        average_length = float(self.total_length) / count
+        scores = Counter()
+        for word in set(words):
+            postings = self.postings.get(word)
+            if not postings:
+                continue
+            idf = math.log(
+                1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+            for pk, frequency in postings.items():
+                if allowed is not None and pk not in allowed:
+                    continue
+                if published_at is not None and not (
+                        pk in self.published and
+                        self.published[pk] <= published_at):
+                    continue
+                scores[pk] += idf * frequency * (K1 + 1) / (frequency + K1 * (
+                    1 - B + B * self.lengths[pk] / average_length))
+        best = heapq.nlargest(
+            limit, scores.items(), key=lambda item: (item[1], item[0]))
+        return [pk for pk, score in best]
+
+    def to_data(self):
+        return {
+            'generation': self.generation,
+            'signature': self.signature,
+            'documents': [[pk, frequencies]
+                          for pk, frequencies in self.documents.items()],
+            'published': [[pk, published.isoformat()]
+                          for pk, published in self.published.items()],
+        }
+
+    @classmethod
+    def from_data(cls, data):
+        shard = cls(data['generation'], data['signature'])
+        for pk, frequencies in data['documents']:
+            shard.add(pk, list(Counter(frequencies).elements()))
+        for pk, published in data['published']:
+            shard.published[pk] = parse_datetime(published)
+        return shard
+
+
+class InvertedIndex(object):
+
+    def __init__(self, max_postings=VACANCIES_MEMORY_INDEX_MAX_POSTINGS,
+                 snapshot=VACANCIES_MEMORY_INDEX_SNAPSHOT):
+        self.max_postings = max_postings
+        self.snapshot = snapshot
+        # {(language, namespace): Shard}, least recently used first.
+        self.shards = OrderedDict()
+        # Shards read from the snapshot, not validated yet.
+        self.unverified = {}
+        # {(language, namespace): pks updated while the shard is built}
+        self.building = {}
+        self.build_locks = {}
+        self.lock = threading.RLock()
+        self.snapshots = BackgroundQueue(self.write_snapshot)
+
+    def get_translations(self, language, namespace):
+        translations = get_translation_model().objects.filter(
+            language_code=language)
+        if namespace:
+            translations = translations.filter(
+                master__app_config__namespace=namespace)
+        return translations
+
+    def get_signature(self, language, namespace):
+        # Publishing in bulk does not touch modified, hence the checksum of
+        # the published pks.
+        signature = self.get_translations(language, namespace).aggregate(
+            count=Count('pk'), modified=Max('master__modified'),
+            published=Sum(Case(
+                When(master__is_published=True, then='master_id'),
+                default=0, output_field=IntegerField())))
+        modified = signature['modified']
+        return [signature['count'], modified.isoformat() if modified else None,
+                signature['published'] or 0]
+
+    def build(self, language, namespace, generation):
+        shard = Shard(generation, self.get_signature(language, namespace))
+        rows = self.get_translations(language, namespace).values_list(
+            'master_id', 'title', 'lead_in', 'search_data',
+            'master__is_published', 'master__publishing_date')
+        for (pk, title, lead_in, search_data,
+             is_published, publishing_date) in rows.iterator():
+            shard.add(
+                pk, get_terms(title, lead_in, search_data),
+                get_published(is_published, publishing_date))
+            if shard.size > self.max_postings:
+                return None
+        return shard
+
+    def get_shard(self, language, namespace):
+        """
+        Returns the up to date shard, or None if it is too large.
+
+        Shards are built without holding the index lock, one at a time per
+        key. Meanwhile the outdated shard, if any, keeps answering.
+        """
+        key = (language, namespace)
+        generation = cache.get_version(namespace)
+        with self.lock:
+            shard = self.shards.pop(key, None)
+            if shard is not None:
+                self.shards[key] = shard
+                if shard.generation == generation:
+                    return shard
+            unverified = self.unverified.pop(key, None)
+            build_lock = self.build_locks.setdefault(key, threading.Lock())
+        if (unverified is not None and unverified.signature ==
+                self.get_signature(language, namespace)):
+            unverified.generation = generation
+            self.store(key, unverified)
+            return unverified
+        if not build_lock.acquire(shard is None):
+            return shard
+        try:
+            with self.lock:
+                current = self.shards.get(key)
+                if current is not None and current.generation == generation:
+                    return current
+                self.building[key] = set()
+            try:
+                shard = self.build(language, namespace, generation)
+            finally:
+                with self.lock:
+                    missed = self.building.pop(key)
+            if shard is None:
+                with self.lock:
+                    self.shards.pop(key, None)
+                return None
+            self.store(key, shard)
+            if missed:
+                # Changes committed while the shard was read.
+                self.update(sorted(missed))
+            self.schedule_snapshot()
+            return shard
+        finally:
+            build_lock.release()
+
+    def store(self, key, shard):
+        with self.lock:
+            self.shards.pop(key, None)
+            self.shards[key] = shard
+            self.evict()
+
+    def evict(self):
+        while (len(self.shards) > 1 and
+               sum(shard.size for shard in self.shards.values()) >
+               self.max_postings):
+            self.shards.popitem(last=False)
+
+    def search(self, query, language, namespace, limit, allowed=None,
+               published=False):
+        """
+        Returns the pks of the best matches (among ``allowed``, if given,
+        and published only with ``published``), or None if the shard does
+        not fit into memory.
+        """
+        words = get_words(query)
+        if not words:
+            return []
+        shard = self.get_shard(language, namespace)
+        if shard is None:
+            return None
+        with self.lock:
+            return shard.search(
+                words, limit, allowed, now() if published else None)
+
+    def update(self, pks):
+        """
+        Reindexes the given vacancies in the shards which are loaded, and
+        removes those which are gone (or moved to another namespace).
+        """
+        with self.lock:
+            if not self.shards and not self.building:
+                return
+        rows = get_translation_model().objects.filter(
+            master_id__in=pks).values_list(
+            'master_id', 'language_code', 'master__app_config__namespace',
+            'title', 'lead_in', 'search_data', 'master__is_published',
+            'master__publishing_date')
+        indexed = set()
+        with self.lock:
+            for missed in self.building.values():
+                missed.update(pks)
+            for (pk, language, namespace, title, lead_in, search_data,
+                 is_published, publishing_date) in rows:
+                terms = get_terms(title, lead_in, search_data)
+                published = get_published(is_published, publishing_date)
+                for key in ((language, namespace), (language, None)):
+                    shard = self.shards.get(key)
+                    if shard is not None:
+                        shard.add(pk, terms, published)
+                        indexed.add((key, pk))
+            for key, shard in self.shards.items():
+                for pk in pks:
+                    if (key, pk) not in indexed:
+                        shard.remove(pk)
+            self.evict()
+        self.schedule_snapshot()
+
+    def invalidated(self, versions):
+        """
+        Moves the shards which were up to date along with the cache version
+        bumps of this process (``{namespace: new version}``). Their changes
+        are reindexed by ``update()``, so only shards another process bumped
+        in between are left behind, to be rebuilt.
+        """
+        with self.lock:
+            for (language, namespace), shard in self.shards.items():
+                version = versions.get(namespace)
+                if version is not None and shard.generation == version - 1:
+                    shard.generation = version
+
+    def schedule_snapshot(self):
+        if self.snapshot:
+            self.snapshots.put([self.snapshot])
+
+    def write_snapshot(self, paths):
+        self.save_snapshot()
+
+    def save_snapshot(self):
+        """
+        Writes all shards to the snapshot file, atomically.
+        """
+        if not self.snapshot:
+            return
+        with self.lock:
+            data = [[list(key), shard.to_data()]
+                    for key, shard in self.shards.items()]
+        write_atomically(
+            self.snapshot, zlib.compress(json.dumps(data).encode('utf-8')))
+
+    def load_snapshot(self):
+        if not self.snapshot or not os.path.exists(self.snapshot):
+            return
+        with open(self.snapshot, 'rb') as snapshot:
+            data = json.loads(
+                force_text(zlib.decompress(snapshot.read())))
+        with self.lock:
+            for key, shard_data in data:
+                if 'published' not in shard_data:
+                    # Written by an older version.
+                    continue
+                self.unverified[tuple(key)] = Shard.from_data(shard_data)
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_index():
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                index = InvertedIndex()
+                index.load_snapshot()
+                _index = index
+    return _index
+
+
+def update_many(pks):
+    if _index is not None:
+        _index.update(pks)
+
+
+def invalidated(versions):
+    if _index is not None:
+        _index.invalidated(versions)
+
+
+pending_updates = OnCommitBatch(update_many)
@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import unicode_literals
+
+import io
+
+from django.conf import settings
+from django.contrib.sites.models import Site
+from django.core.management.base import BaseCommand
+
+from js_vacancies.exports import FORMATS, export
+
+
+class Command(BaseCommand):
+    help = (
+        'Exports the open, published vacancies of a section as JSON Lines '
+        'or job-board XML.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'namespace', help='Namespace of the section (apphook config).')
+        parser.add_argument(
+            '--language', default=settings.LANGUAGE_CODE,
+            help='Language of the export (default LANGUAGE_CODE).')
+        parser.add_argument(
+            '--format', choices=FORMATS, default='jsonl',
+            help='Output format (default jsonl).')
+        parser.add_argument(
+            '--base-url', default='',
+            help='Prefixed to the vacancy URLs, e.g. https://example.com. '
+                 'Defaults to the domain of the current site.')
+        parser.add_argument(
+            '--output',
+            help='File to write to, instead of the standard output.')
+
+    def handle(self, *args, **options):
+        site = Site.objects.get_current()
+        base_url = options['base_url'] or 'https://{0}'.format(site.domain)
+        chunks = export(
+            options['format'], options['namespace'], options['language'],
+            base_url=base_url.rstrip('/'), publisher=site.name)
+        if options['output']:
+            with io.open(options['output'], 'w', encoding='utf-8') as output:
+                for chunk in chunks:
+                    output.write(chunk)
+        else:
+            for chunk in chunks:
+                self.stdout.write(chunk, ending='')
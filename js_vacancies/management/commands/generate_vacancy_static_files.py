@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import unicode_literals
+
+from django.core.management.base import BaseCommand, CommandError
+
+from js_vacancies.constants import (
+    VACANCIES_STATIC_FILES_DIR,
+    VACANCIES_STATIC_FILES_GZIP,
+)
+from js_vacancies.static_files import generate
+
+
+class Command(BaseCommand):
+    help = (
+        'Writes the vacancies sitemaps and feeds to static files, for the '
+        'web server to serve without Django.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--output-dir', default=VACANCIES_STATIC_FILES_DIR,
+            help='Directory to write to (default '
+                 'VACANCIES_STATIC_FILES_DIR).')
+        parser.add_argument(
+            '--gzip', action='store_true',
+            default=VACANCIES_STATIC_FILES_GZIP,
+            help='Also write gzipped copies.')
+        parser.add_argument(
+            '--protocol', default='https',
+            help='Protocol of the URLs (default https).')
+        parser.add_argument(
+            '--categories', action='store_true', default=False,
+            help='Also write the feed of every category.')
+        parser.add_argument(
+            '--namespace', action='append', dest='namespaces',
+            help='Only write the feeds of this section (can be repeated).')
+
+    def handle(self, *args, **options):
+        if not options['output_dir']:
+            raise CommandError(
+                'Pass --output-dir or set VACANCIES_STATIC_FILES_DIR.')
+        written = generate(
+            options['output_dir'], use_gzip=options['gzip'],
+            protocol=options['protocol'], categories=options['categories'],
+            namespaces=options['namespaces'])
+        self.stdout.write('Wrote {0} files to {1}.'.format(
+            len(written), options['output_dir']))
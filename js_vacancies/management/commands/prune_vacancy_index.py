@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import unicode_literals
+
+import datetime
+
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from haystack import connections
+from haystack.exceptions import NotHandled
+
+from js_vacancies.managers import get_today
+from js_vacancies.models import Vacancy
+
+
+class Command(BaseCommand):
+    help = (
+        'Removes closed and unpublished vacancies from the search index, '
+        'which update_index --age does not.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--age', type=int, default=None,
+            help='Only consider vacancies closed or modified in the last '
+                 'AGE days.')
+
+    def handle(self, *args, **options):
+        stale = Q(closing_date__lt=get_today()) | Q(is_published=False)
+        if options['age'] is not None:
+            since = get_today() - datetime.timedelta(days=options['age'])
+            stale &= Q(closing_date__gte=since) | Q(modified__gte=since)
+        vacancies = Vacancy.objects.filter(stale).only('pk').order_by('pk')
+
+        count = 0
+        for alias in connections.connections_info:
+            try:
+                index = connections[alias].get_unified_index().get_index(
+                    Vacancy)
+            except NotHandled:
+                continue
+            for vacancy in vacancies.iterator():
+                index.remove_object(vacancy, using=alias)
+                count += 1
+        self.stdout.write(
+            'Removed {0} vacancies from the search index.'.format(count))
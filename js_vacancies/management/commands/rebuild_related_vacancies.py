@@ -0,0 +1,21 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import unicode_literals
+
+from django.core.management.base import BaseCommand
+
+from js_vacancies.models import Vacancy
+from js_vacancies.related import rebuild_related_vacancies
+
+
+class Command(BaseCommand):
+    help = 'Recomputes the precomputed related vacancies of every vacancy.'
+
+    def handle(self, *args, **options):
+        pks = Vacancy.objects.order_by('pk').values_list('pk', flat=True)
+        count = 0
+        for pk in pks.iterator():
+            rebuild_related_vacancies(pk)
+            count += 1
+        self.stdout.write('Rebuilt related vacancies of {0} vacancies.'.format(
+            count))
@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import unicode_literals
+
+import json
+import multiprocessing
+import os
+import time
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.utils.dateparse import parse_datetime
+
+from js_vacancies.models import Vacancy, rebuild_search_data
+
+
+def rebuild_batch(batch):
+    language, pks = batch
+    changed = rebuild_search_data([(pk, language) for pk in pks])
+    return language, pks, changed
+
+
+def setup_worker():
+    # Needed when the workers are spawned rather than forked.
+    django.setup()
+
+
+def get_batches(pks, batch_size):
+    for start in range(0, len(pks), batch_size):
+        yield pks[start:start + batch_size]
+
+
+class Command(BaseCommand):
+    help = (
+        'Rebuilds the search_data of the vacancy translations. Only the '
+        'translations whose text changed are saved.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--language', action='append', dest='languages',
+            help='Only rebuild this language (repeatable).')
+        parser.add_argument(
+            '--batch-size', type=int, default=100,
+            help='Number of vacancies rebuilt per batch (default 100).')
+        parser.add_argument(
+            '--processes', type=int, default=1,
+            help='Number of worker processes (default 1).')
+        parser.add_argument(
+            '--since',
+            help='Only rebuild vacancies modified since this date/time.')
+        parser.add_argument(
+            '--checkpoint',
+            help='File recording the progress, to resume an interrupted '
+                 'run from. Removed once the run completes.')
+
+    def handle(self, *args, **options):
+        languages = options['languages'] or [
+            code for code, name in settings.LANGUAGES]
+        batch_size = max(options['batch_size'], 1)
+        vacancies = Vacancy.objects.order_by('pk')
+        if options['since']:
+            since = parse_datetime(options['since'])
+            if since is None:
+                raise CommandError('Invalid --since: {0}'.format(
+                    options['since']))
+            vacancies = vacancies.filter(modified__gte=since)
+
+        checkpoint = options['checkpoint']
+        done = {}
+        if checkpoint and os.path.exists(checkpoint):
+            with open(checkpoint) as data:
+                done = json.load(data)
+
+        batches = []
+        total = 0
+        for language in languages:
+            pks = list(vacancies.filter(
+                translations__language_code=language,
+                pk__gt=done.get(language, 0)).values_list('pk', flat=True))
+            total += len(pks)
+            batches.extend(
+                (language, batch) for batch in get_batches(pks, batch_size))
+
+        if options['processes'] > 1:
+            # Workers must not share the connections of this process.
+            connections.close_all()
+            pool = multiprocessing.Pool(
+                options['processes'], initializer=setup_worker)
+            results = pool.imap(rebuild_batch, batches)
+        else:
+            pool = None
+            results = (rebuild_batch(batch) for batch in batches)
+
+        started = time.time()
+        count = changed = 0
+        try:
+            # Results come back in order, so every pk up to the last one
+            # of a batch has been rebuilt.
+            for language, pks, batch_changed in results:
+                count += len(pks)
+                changed += batch_changed
+                if checkpoint:
+                    done[language] = pks[-1]
+                    with open(checkpoint, 'w') as data:
+                        json.dump(done, data)
+                elapsed = max(time.time() - started, 0.001)
+                self.stdout.write(
+                    '{0}/{1} vacancies, {2} changed, '
+                    '{3:.1f} per second'.format(
+                        count, total, changed, count / elapsed))
+        finally:
+            if pool is not None:
+                pool.terminate()
+
+        if checkpoint and os.path.exists(checkpoint):
+            os.remove(checkpoint)
+        self.stdout.write(
+            'Rebuilt the search data of {0} vacancy translations, '
+            '{1} changed.'.format(count, changed))
@@ -2,20 +2,28 @@
 
 from __future__ import unicode_literals
 
-try:
-    from collections import Counter
-except ImportError:
-    from backport_collections import Counter
-
 import datetime
 from operator import attrgetter
 
+from django.conf import settings
 from django.db import models
+from django.db.models import Case, Count, F, Max, Min, Q, Subquery, When
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
 from django.utils.timezone import now
 
 from aldryn_apphooks_config.managers.base import ManagerMixin, QuerySetMixin
 from parler.managers import TranslatableManager, TranslatableQuerySet
 
+from . import cache
+
+
+def get_today():
+    current = now()
+    if settings.USE_TZ:
+        return timezone.localtime(current).date()
+    return current.date()
+
 
 class VacancyQuerySet(QuerySetMixin, TranslatableQuerySet):
     def published(self):
@@ -25,6 +33,86 @@ class VacancyQuerySet(QuerySetMixin, TranslatableQuerySet):
         """
         return self.filter(is_published=True, publishing_date__lte=now())
 
+    def open(self):
+        """
+        Returns the vacancies whose closing_date, if any, has not passed.
+        """
+        return self.filter(
+            Q(closing_date__isnull=True) | Q(closing_date__gte=get_today()))
+
+    def closed(self):
+        return self.filter(closing_date__lt=get_today())
+
+    def last_modified(self):
+        """
+        Returns the latest modification or publishing date of the vacancies
+        in this queryset, i.e. when its contents last changed.
+        """
+        dates = self.order_by().aggregate(
+            modified=Max('modified'), published=Max('publishing_date'))
+        dates = [value for value in dates.values() if value]
+        return max(dates) if dates else None
+
+    def for_listing(self):
+        """
+        Loads everything needed to render vacancies in lists, feeds, menus
+        and sitemaps in a fixed number of queries.
+        """
+        # The translations are loaded whole: parler caches every translated
+        # field of a prefetched translation, so deferring one of them would
+        # cost a query per vacancy.
+        return self.select_related(
+            'app_config', 'location', 'featured_image',
+        ).prefetch_related(
+            'translations', 'categories', 'services', 'companies')
+
+    def for_urls(self):
+        """
+        Loads everything needed to build the URLs of the vacancies, see
+        ``js_vacancies.utils.get_vacancy_urls``.
+        """
+        return self.select_related('app_config').prefetch_related(
+            'translations')
+
+    def for_indexing(self):
+        """
+        Loads everything the search index needs for its title, description,
+        URL and text up front.
+        """
+        return self.select_related('app_config').prefetch_related(
+            'translations', 'categories')
+
+    def related_to(self, vacancy):
+        """
+        Returns the precomputed related vacancies of the given vacancy, best
+        match first.
+        """
+        return self.filter(ranked_for__vacancy=vacancy).order_by(
+            '-ranked_for__score', '-pk')
+
+    def neighbours(self, vacancy):
+        """
+        Returns a (previous, next) tuple with the vacancies of this queryset
+        published immediately before and after the given vacancy. Both are
+        fetched with a single query; either may be None.
+        """
+        scope = self.model.objects.filter(
+            pk__in=self.order_by().values('pk'))
+        prev_pk = scope.filter(
+            publishing_date__lt=vacancy.publishing_date
+        ).order_by('-publishing_date', '-pk').values('pk')[:1]
+        next_pk = scope.filter(
+            publishing_date__gt=vacancy.publishing_date
+        ).order_by('publishing_date', 'pk').values('pk')[:1]
+        prev_obj = next_obj = None
+        for obj in self.filter(Q(pk=Subquery(prev_pk)) |
+                               Q(pk=Subquery(next_pk))):
+            if obj.publishing_date < vacancy.publishing_date:
+                prev_obj = obj
+            else:
+                next_obj = obj
+        return prev_obj, next_obj
+
 
 class RelatedManager(ManagerMixin, TranslatableManager):
     def get_queryset(self):
@@ -34,6 +122,44 @@ class RelatedManager(ManagerMixin, TranslatableManager):
     def published(self):
         return self.get_queryset().published()
 
+    def for_listing(self):
+        return self.get_queryset().for_listing()
+
+    def for_urls(self):
+        return self.get_queryset().for_urls()
+
+    def get_next_transition(self, namespace=None):
+        """
+        Returns the earliest moment at which the published vacancies of the
+        namespace (or of all namespaces) change without anybody saving
+        anything: the next scheduled publishing_date, or the end of the next
+        closing_date. Returns None if there is no such moment.
+        """
+        current = now()
+        today = get_today()
+        queryset = self.get_queryset().filter(is_published=True)
+        if namespace:
+            queryset = queryset.namespace(namespace)
+        dates = queryset.order_by().aggregate(
+            publishing=Min(Case(
+                When(publishing_date__gt=current, then=F('publishing_date')),
+                output_field=models.DateTimeField())),
+            closing=Min(Case(
+                When(closing_date__gte=today, then=F('closing_date')),
+                output_field=models.DateField())),
+        )
+        transitions = []
+        if dates['publishing']:
+            transitions.append(dates['publishing'])
+        if dates['closing']:
+            closed = datetime.datetime.combine(
+                dates['closing'] + datetime.timedelta(days=1),
+                datetime.time.min)
+            if settings.USE_TZ:
+                closed = timezone.make_aware(closed)
+            transitions.append(closed)
+        return min(transitions) if transitions else None
+
     def get_months(self, request, namespace):
         """
         Get months and years with Vacancies count for given request and namespace
@@ -53,23 +179,33 @@ class RelatedManager(ManagerMixin, TranslatableManager):
         ]
         """
 
-        # TODO: check if this limitation still exists in Django 1.6+
-        # This is done in a naive way as Django is having tough time while
-        # aggregating on date fields
-        if (request and hasattr(request, 'toolbar') and
-                request.toolbar and request.toolbar.edit_mode):
+        edit_mode = bool(request and hasattr(request, 'toolbar') and
+                         request.toolbar and request.toolbar.edit_mode)
+        key = cache.make_key('months', namespace, edit_mode)
+        months = cache.get_cached(key)
+        if months is None:
+            months = self.count_months(namespace, edit_mode)
+            cache.set_cached(key, months, namespace=namespace)
+        return months
+
+    def count_months(self, namespace, edit_mode=False):
+        """
+        Aggregates the number of vacancies per month in the database, see
+        get_months().
+        """
+        if edit_mode:
             vacancies = self.namespace(namespace)
         else:
             vacancies = self.published().namespace(namespace)
-        dates = vacancies.values_list('publishing_date', flat=True)
-        dates = [(x.year, x.month) for x in dates]
-        date_counter = Counter(dates)
-        dates = set(dates)
-        dates = sorted(dates, reverse=True)
-        months = [
+        rows = vacancies.order_by().annotate(
+            month=TruncMonth('publishing_date'),
+        ).values('month').annotate(
+            num_vacancies=Count('pk'),
+        ).order_by('-month')
+        return [
             # Use day=3 to make sure timezone won't affect this hacks'
             # month value. There are UTC+14 and UTC-12 timezones!
-            {'date': datetime.date(year=year, month=month, day=3),
-             'num_vacancies': date_counter[(year, month)]}
-            for year, month in dates]
-        return months
+            {'date': datetime.date(
+                year=row['month'].year, month=row['month'].month, day=3),
+             'num_vacancies': row['num_vacancies']}
+            for row in rows]
@@ -0,0 +1,36 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('js_vacancies', '0004_vacancy_companies'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RelatedVacancy',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.PositiveIntegerField(default=0, verbose_name='score')),
+                ('related', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ranked_for', to='js_vacancies.Vacancy')),
+                ('vacancy', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='related_rankings', to='js_vacancies.Vacancy')),
+            ],
+            options={
+                'verbose_name': 'related vacancy',
+                'verbose_name_plural': 'related vacancies',
+            },
+        ),
+        migrations.AlterUniqueTogether(
+            name='relatedvacancy',
+            unique_together=set([('vacancy', 'related')]),
+        ),
+        migrations.AlterIndexTogether(
+            name='relatedvacancy',
+            index_together=set([('vacancy', 'score')]),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('js_vacancies', '0005_relatedvacancy'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='vacanciesconfig',
+            name='pagination_mode',
+            field=models.CharField(choices=[('pages', 'Numbered pages'), ('cursor', 'Previous/next only (fast for large lists)')], default='pages', help_text='Numbered pages need to count all vacancies and get slower the deeper the page; previous/next pagination costs the same on every page.', max_length=10, verbose_name='Pagination mode'),
+        ),
+    ]
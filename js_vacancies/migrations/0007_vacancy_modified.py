@@ -0,0 +1,21 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('js_vacancies', '0006_vacanciesconfig_pagination_mode'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='vacancy',
+            name='modified',
+            field=models.DateTimeField(auto_now=True, db_index=True, default=django.utils.timezone.now, verbose_name='modified'),
+            preserve_default=False,
+        ),
+    ]
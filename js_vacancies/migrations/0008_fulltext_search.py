@@ -0,0 +1,38 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations
+
+
+def get_backend(schema_editor):
+    from js_vacancies.search import get_backend_class
+
+    connection = schema_editor.connection
+    backend_class = get_backend_class(connection, 'auto')
+    if backend_class.vendor != connection.vendor:
+        return None
+    return backend_class(connection)
+
+
+def install_fulltext_search(apps, schema_editor):
+    backend = get_backend(schema_editor)
+    if backend is not None:
+        backend.install()
+
+
+def uninstall_fulltext_search(apps, schema_editor):
+    backend = get_backend(schema_editor)
+    if backend is not None:
+        backend.uninstall()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('js_vacancies', '0007_vacancy_modified'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            install_fulltext_search, uninstall_fulltext_search),
+    ]
@@ -0,0 +1,19 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('js_vacancies', '0008_fulltext_search'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='vacanciesconfig',
+            name='feed_items',
+            field=models.PositiveSmallIntegerField(default=10, help_text='How many of the latest vacancies do the feeds list?', verbose_name='Feed size'),
+        ),
+    ]
@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from collections import Counter, defaultdict
+
+from django.db import migrations
+
+
+def fill_related_vacancies(apps, schema_editor):
+    """
+    Computes the rankings of the existing vacancies, like the
+    rebuild_related_vacancies command, in one pass over the links.
+    """
+    from js_vacancies.constants import VACANCIES_RELATED_WEIGHTS
+    from js_vacancies.related import RELATED_FIELDS, top
+
+    Vacancy = apps.get_model('js_vacancies', 'Vacancy')
+    RelatedVacancy = apps.get_model('js_vacancies', 'RelatedVacancy')
+    db_alias = schema_editor.connection.alias
+
+    published = set(Vacancy.objects.using(db_alias).filter(
+        is_published=True).values_list('pk', flat=True))
+    scores = defaultdict(Counter)
+    for field_name in RELATED_FIELDS:
+        weight = VACANCIES_RELATED_WEIGHTS.get(field_name, 0)
+        if not weight:
+            continue
+        field = Vacancy._meta.get_field(field_name)
+        through = field.remote_field.through
+        linked = defaultdict(list)
+        for pk, target_pk in through.objects.using(db_alias).values_list(
+                field.m2m_field_name(), field.m2m_reverse_field_name()):
+            linked[target_pk].append(pk)
+        for pks in linked.values():
+            for pk in pks:
+                for other_pk in pks:
+                    if other_pk != pk and other_pk in published:
+                        scores[pk][other_pk] += weight
+
+    RelatedVacancy.objects.using(db_alias).all().delete()
+    RelatedVacancy.objects.using(db_alias).bulk_create([
+        RelatedVacancy(vacancy_id=pk, related_id=other_pk, score=score)
+        for pk, vacancy_scores in scores.items()
+        for other_pk, score in top(vacancy_scores)
+    ], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('js_vacancies', '0009_vacanciesconfig_feed_items'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            fill_related_vacancies, migrations.RunPython.noop),
+    ]
@@ -2,36 +2,45 @@
 
 from __future__ import unicode_literals
 
+from collections import defaultdict
+
 from aldryn_apphooks_config.fields import AppHookConfigField
 from aldryn_categories.models import Category
 from aldryn_categories.fields import CategoryManyToManyField
 from aldryn_translation_tools.models import TranslatedAutoSlugifyMixin, TranslationHelperMixin
 from cms.models.fields import PlaceholderField
 from cms.models.pluginmodel import CMSPlugin
-from cms.utils.i18n import get_current_language, get_redirect_on_fallback
+from cms.utils.i18n import get_current_language
 from django.conf import settings
 from django.core.exceptions import ImproperlyConfigured
-try:
-    from django.core.urlresolvers import reverse
-except ImportError:
-    # Django 2.0
-    from django.urls import reverse
 from django.db import connection, models
-from django.db.models.signals import post_save
+from django.db.models.signals import (
+    m2m_changed, post_delete, post_save, pre_delete, pre_save)
 from django.dispatch import receiver
 from django.utils.encoding import python_2_unicode_compatible
 from django.utils.timezone import now
 from django.utils.translation import ugettext_lazy as _
-from django.utils.translation import override, ugettext
+from django.utils.translation import ugettext
 from djangocms_text_ckeditor.fields import HTMLField
 from sortedm2m.fields import SortedManyToManyField
 from filer.fields.image import FilerImageField
 from parler.models import TranslatableModel, TranslatedFields
-from aldryn_newsblog.utils import get_plugin_index_data, get_request, strip_tags
+from aldryn_newsblog.utils import get_request, strip_tags
 from js_locations.models import Location
 
+from . import autocomplete, cache, inverted_index, related, search
 from .cms_appconfig import VacanciesConfig
+from .constants import (
+    VACANCIES_FULLTEXT_BACKEND,
+    VACANCIES_SEARCH_DATA_IN_BACKGROUND,
+    VACANCIES_STATIC_FILES_DIR,
+    VACANCIES_STATIC_FILES_GZIP,
+    VACANCIES_STATIC_FILES_ON_PUBLISH,
+)
 from .managers import RelatedManager
+from .signals import cache_invalidated, vacancies_updated
+from .utils import (
+    BackgroundQueue, OnCommitBatch, get_plugins_text, get_vacancy_url)
 
 try:
     from django.utils.encoding import force_unicode
@@ -111,6 +120,8 @@ class Vacancy(TranslatedAutoSlugifyMixin,
         blank=True)
     publishing_date = models.DateTimeField(_('publishing date'),
         default=now)
+    modified = models.DateTimeField(_('modified'), auto_now=True,
+        db_index=True)
     is_published = models.BooleanField(_('is published'), default=False,
         db_index=True)
     is_featured = models.BooleanField(_('is featured'), default=False,
@@ -163,34 +174,7 @@ class Vacancy(TranslatedAutoSlugifyMixin,
 
     def get_absolute_url(self, language=None):
         """Returns the url for this Vacancy in the selected permalink format."""
-        if not language:
-            language = get_current_language()
-        kwargs = {}
-        permalink_type = self.app_config.permalink_type
-        if 'y' in permalink_type:
-            kwargs.update(year=self.publishing_date.year)
-        if 'm' in permalink_type:
-            kwargs.update(month="%02d" % self.publishing_date.month)
-        if 'd' in permalink_type:
-            kwargs.update(day="%02d" % self.publishing_date.day)
-        if 'i' in permalink_type:
-            kwargs.update(pk=self.pk)
-        if 's' in permalink_type:
-            slug, lang = self.known_translation_getter(
-                'slug', default=None, language_code=language)
-            if slug and lang:
-                site_id = getattr(settings, 'SITE_ID', None)
-                if get_redirect_on_fallback(language, site_id):
-                    language = lang
-                kwargs.update(slug=slug)
-
-        if self.app_config and self.app_config.namespace:
-            namespace = '{0}:'.format(self.app_config.namespace)
-        else:
-            namespace = ''
-
-        with override(language):
-            return reverse('{0}vacancy-detail'.format(namespace), kwargs=kwargs)
+        return get_vacancy_url(self, language)
 
     def get_search_data(self, language=None, request=None):
         """
@@ -201,22 +185,7 @@ class Vacancy(TranslatedAutoSlugifyMixin,
             return ''
         if language is None:
             language = get_current_language()
-        if request is None:
-            request = get_request(language=language)
-        description = self.safe_translation_getter('lead_in', '')
-        text_bits = [strip_tags(description)]
-        for category in self.categories.all():
-            text_bits.append(
-                force_unicode(category.safe_translation_getter('name')))
-        for tag in self.tags.all():
-            text_bits.append(force_unicode(tag.name))
-        if self.content:
-            plugins = self.content.cmsplugin_set.filter(language=language)
-            for base_plugin in plugins:
-                plugin_text_content = ' '.join(
-                    get_plugin_index_data(base_plugin, request))
-                text_bits.append(plugin_text_content)
-        return ' '.join(text_bits)
+        return get_search_data([self], language, request)[self.pk]
 
     def save(self, *args, **kwargs):
         # Update the search index
@@ -230,12 +199,119 @@ class Vacancy(TranslatedAutoSlugifyMixin,
         return self.safe_translation_getter('title', any_language=True)
 
 
+class RelatedVacancy(models.Model):
+    """
+    A precomputed neighbour of a vacancy, see ``js_vacancies.related``.
+    """
+    vacancy = models.ForeignKey(Vacancy,
+        on_delete=models.CASCADE,
+        related_name='related_rankings')
+    related = models.ForeignKey(Vacancy,
+        on_delete=models.CASCADE,
+        related_name='ranked_for')
+    score = models.PositiveIntegerField(_('score'), default=0)
+
+    class Meta:
+        unique_together = (('vacancy', 'related'), )
+        index_together = (('vacancy', 'score'), )
+        verbose_name = _('related vacancy')
+        verbose_name_plural = _('related vacancies')
+
+
+# Bumps the cache versions once the transaction commits.
+pending_invalidations = OnCommitBatch(cache.invalidate)
+
+
+def invalidate_on_commit(namespaces=()):
+    """
+    Invalidates the cache of the namespaces, and across namespaces, once
+    the transaction commits. Bumping the versions earlier would let a
+    request running meanwhile cache the old data under the new versions.
+    """
+    # '' only makes sure that the batch is flushed.
+    pending_invalidations.add(
+        '', *[namespace or '' for namespace in namespaces])
+
+
+def get_namespaces(vacancies):
+    return vacancies.order_by().values_list(
+        'app_config__namespace', flat=True).distinct()
+
+
+def get_search_data(vacancies, language, request=None):
+    """
+    Returns {pk: search data} of ``vacancies`` in ``language``: their
+    lead_in, categories and content plugins, extracted in a handful of
+    queries for all of them. Prefetch the categories when passing a
+    queryset.
+    """
+    if request is None:
+        request = get_request(language=language)
+    vacancies = list(vacancies)
+    plugins_text = get_plugins_text(
+        [vacancy.content_id for vacancy in vacancies if vacancy.content_id],
+        language, request)
+    search_data = {}
+    for vacancy in vacancies:
+        description = vacancy.safe_translation_getter(
+            'lead_in', '', language_code=language)
+        text_bits = [strip_tags(description)]
+        for category in vacancy.categories.all():
+            text_bits.append(force_unicode(category.safe_translation_getter(
+                'name', language_code=language)))
+        if vacancy.content_id in plugins_text:
+            text_bits.append(plugins_text[vacancy.content_id])
+        search_data[vacancy.pk] = ' '.join(text_bits)
+    return search_data
+
+
+def rebuild_search_data(keys):
+    """
+    Rebuilds the search_data of the given (vacancy pk, language) pairs,
+    saving only the translations whose text changed. Returns the number of
+    changed translations.
+    """
+    pks = defaultdict(list)
+    for pk, language in keys:
+        pks[language].append(pk)
+    changed = 0
+    namespaces = set()
+    for language, language_pks in pks.items():
+        vacancies = [
+            vacancy for vacancy in Vacancy.objects.language(language).filter(
+                pk__in=language_pks).select_related(
+                'app_config').prefetch_related('categories')
+            if vacancy.has_translation(language)]
+        search_data = get_search_data(vacancies, language)
+        for vacancy in vacancies:
+            translation = vacancy._get_translated_model(language)
+            if translation.search_data != search_data[vacancy.pk]:
+                translation.search_data = search_data[vacancy.pk]
+                translation.save(update_fields=['search_data'])
+                changed += 1
+                if vacancy.app_config_id:
+                    namespaces.add(vacancy.app_config.namespace)
+    if namespaces:
+        invalidate_on_commit(namespaces)
+    return changed
+
+
+if VACANCIES_SEARCH_DATA_IN_BACKGROUND:
+    pending_search_data = OnCommitBatch(
+        BackgroundQueue(rebuild_search_data).put)
+else:
+    pending_search_data = OnCommitBatch(rebuild_search_data)
+
+
 @receiver(post_save, dispatch_uid='vacancy_update_search_data')
 def update_search_data(sender, instance, **kwargs):
     """
     Upon detecting changes in a plugin used in an vacancy's content
     (PlaceholderField), update the vacancy's search_index so that we can
     perform simple searches even without Haystack, etc.
+
+    The rebuild is deferred until the transaction commits, once per
+    vacancy and language however many plugins were saved.
     """
     is_cms_plugin = issubclass(instance.__class__, CMSPlugin)
 
@@ -244,7 +320,291 @@ def update_search_data(sender, instance, **kwargs):
                        instance.placeholder)
         if hasattr(placeholder, '_attached_model_cache'):
             if placeholder._attached_model_cache == Vacancy and placeholder.slot == 'content':
-                vacancy = placeholder._attached_model_cache.objects.language(
-                    instance.language).get(content=placeholder.pk)
-                vacancy.search_data = vacancy.get_search_data(instance.language)
-                vacancy.save()
+                pending_search_data.add(*[
+                    (pk, instance.language) for pk in
+                    Vacancy.objects.filter(content=placeholder.pk).values_list(
+                        'pk', flat=True)])
+
+
+@receiver([post_save, post_delete], sender=Vacancy,
+          dispatch_uid='vacancy_invalidate_cache')
+def invalidate_vacancy_cache(sender, instance, **kwargs):
+    """
+    Drops everything cached for the vacancy's namespace.
+    """
+    namespaces = []
+    if instance.app_config_id:
+        namespaces.append(instance.app_config.namespace)
+    invalidate_on_commit(namespaces)
+
+
+def invalidate_vacancy_translation_cache(sender, instance, raw=False,
+                                         **kwargs):
+    if not raw:
+        invalidate_on_commit(get_namespaces(
+            Vacancy.objects.filter(pk=instance.master_id)))
+
+
+def invalidate_vacancy_links_cache(sender, instance, action, reverse, pk_set,
+                                   **kwargs):
+    """
+    Drops everything cached for the namespaces of the vacancies whose
+    categories, services or companies were changed, from either side of
+    the relation.
+    """
+    if action not in ('post_add', 'post_remove', 'pre_clear', 'post_clear'):
+        return
+    if not reverse:
+        if action != 'pre_clear':
+            invalidate_on_commit(get_namespaces(
+                Vacancy.objects.filter(pk=instance.pk)))
+    elif action == 'pre_clear':
+        source, target = related.get_link_fields(sender)
+        invalidate_on_commit(get_namespaces(Vacancy.objects.filter(
+            pk__in=sender.objects.filter(**{target: instance.pk}).values(
+                source))))
+    elif pk_set:
+        invalidate_on_commit(get_namespaces(
+            Vacancy.objects.filter(pk__in=pk_set)))
+
+
+post_save.connect(
+    invalidate_vacancy_translation_cache,
+    sender=Vacancy._parler_meta.root_model,
+    dispatch_uid='vacancy_translation_invalidate_cache')
+post_delete.connect(
+    invalidate_vacancy_translation_cache,
+    sender=Vacancy._parler_meta.root_model,
+    dispatch_uid='vacancy_translation_delete_invalidate_cache')
+for field_name in related.RELATED_FIELDS:
+    m2m_changed.connect(
+        invalidate_vacancy_links_cache,
+        sender=Vacancy._meta.get_field(field_name).remote_field.through,
+        dispatch_uid='vacancy_{0}_invalidate_cache'.format(field_name))
+
+
+def touch_vacancies(placeholder_ids):
+    """
+    Marks the vacancies with the given content placeholders as modified.
+    """
+    vacancies = Vacancy.objects.filter(content_id__in=placeholder_ids)
+    namespaces = set(vacancies.values_list(
+        'app_config__namespace', flat=True))
+    if namespaces:
+        vacancies.update(modified=now())
+        invalidate_on_commit(namespaces)
+
+
+pending_touches = OnCommitBatch(touch_vacancies)
+
+
+@receiver([post_save, post_delete],
+          dispatch_uid='vacancy_plugin_touch_modified')
+def touch_vacancy_on_plugin_change(sender, instance, **kwargs):
+    """
+    Marks the vacancy as modified when a plugin of its content placeholder
+    is changed or deleted, once per placeholder and transaction however
+    many plugins were changed.
+    """
+    if not isinstance(instance, CMSPlugin) or not instance.placeholder_id:
+        return
+    pending_touches.add(instance.placeholder_id)
+
+
+def update_fulltext_index(sender, instance, raw=False, **kwargs):
+    if not raw:
+        search.get_search_backend().update(instance)
+
+
+def delete_fulltext_index(sender, instance, **kwargs):
+    search.get_search_backend().delete(instance)
+
+
+post_save.connect(
+    update_fulltext_index, sender=Vacancy._parler_meta.root_model,
+    dispatch_uid='vacancy_translation_update_fulltext_index')
+post_delete.connect(
+    delete_fulltext_index, sender=Vacancy._parler_meta.root_model,
+    dispatch_uid='vacancy_translation_delete_fulltext_index')
+
+
+if VACANCIES_FULLTEXT_BACKEND == 'memory':
+    # The translations are reindexed by update_fulltext_index; a vacancy may
+    # also move to another namespace without them being saved.
+    @receiver(post_save, sender=Vacancy,
+              dispatch_uid='vacancy_update_memory_index')
+    def update_memory_index(sender, instance, raw=False, **kwargs):
+        if not raw:
+            inverted_index.pending_updates.add(instance.pk)
+
+    @receiver(vacancies_updated,
+              dispatch_uid='vacancies_updated_update_memory_index')
+    def update_memory_index_on_bulk_update(sender, pks, **kwargs):
+        inverted_index.pending_updates.add(*pks)
+
+    @receiver(cache_invalidated,
+              dispatch_uid='cache_invalidated_update_memory_index')
+    def update_memory_index_versions(sender, versions, **kwargs):
+        inverted_index.invalidated(versions)
+
+
+@receiver(post_save, sender=VacanciesConfig,
+          dispatch_uid='vacancies_config_invalidate_cache')
+def invalidate_config_cache(sender, instance, **kwargs):
+    invalidate_on_commit([instance.namespace])
+
+
+@receiver(vacancies_updated, dispatch_uid='vacancies_updated_invalidate_cache')
+def invalidate_updated_vacancies_cache(sender, namespaces, **kwargs):
+    invalidate_on_commit(namespaces)
+
+
+@receiver(post_save, sender=Vacancy, dispatch_uid='vacancy_update_related')
+def update_related_on_save(sender, instance, raw=False, **kwargs):
+    if not raw:
+        related.pending_updates.add(instance.pk)
+
+
+@receiver(pre_delete, sender=Vacancy, dispatch_uid='vacancy_delete_related')
+def update_related_on_delete(sender, instance, **kwargs):
+    related.pending_rebuilds.add(*instance.ranked_for.values_list(
+        'vacancy_id', flat=True))
+
+
+@receiver(vacancies_updated, dispatch_uid='vacancies_updated_related')
+def update_related_on_bulk_update(sender, pks, **kwargs):
+    related.pending_updates.add(*pks)
+
+
+def update_related_on_m2m_changed(sender, instance, action, reverse, pk_set,
+                                  **kwargs):
+    """
+    Updates the related vacancies when categories, services or companies
+    are linked or unlinked, from either side of the relation.
+    """
+    if action not in ('post_add', 'post_remove', 'pre_clear', 'post_clear'):
+        return
+    if not reverse:
+        if action != 'pre_clear':
+            related.pending_updates.add(instance.pk)
+    elif action == 'pre_clear':
+        source, target = related.get_link_fields(sender)
+        related.pending_updates.add(*sender.objects.filter(
+            **{target: instance.pk}).values_list(source, flat=True))
+    elif pk_set:
+        related.pending_updates.add(*pk_set)
+
+
+for field_name in related.RELATED_FIELDS:
+    m2m_changed.connect(
+        update_related_on_m2m_changed,
+        sender=Vacancy._meta.get_field(field_name).remote_field.through,
+        dispatch_uid='vacancy_{0}_update_related'.format(field_name))
+
+
+@receiver([post_save, post_delete], sender=Vacancy,
+          dispatch_uid='vacancy_update_autocomplete')
+def update_autocomplete_on_change(sender, instance, raw=False, **kwargs):
+    if not raw:
+        autocomplete.pending_updates.add(instance.pk)
+
+
+def update_autocomplete_on_translation_change(sender, instance, raw=False,
+                                              **kwargs):
+    if not raw:
+        autocomplete.pending_updates.add(instance.master_id)
+
+
+@receiver(vacancies_updated, dispatch_uid='vacancies_updated_autocomplete')
+def update_autocomplete_on_bulk_update(sender, pks, **kwargs):
+    autocomplete.pending_updates.add(*pks)
+
+
+@receiver(cache_invalidated, dispatch_uid='cache_invalidated_autocomplete')
+def update_autocomplete_versions(sender, versions, **kwargs):
+    autocomplete.invalidated(versions)
+
+
+def update_autocomplete_on_categories_changed(sender, instance, action,
+                                              reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        autocomplete.pending_updates.add(instance.pk)
+    elif pk_set:
+        autocomplete.pending_updates.add(*pk_set)
+
+
+post_save.connect(
+    update_autocomplete_on_translation_change,
+    sender=Vacancy._parler_meta.root_model,
+    dispatch_uid='vacancy_translation_update_autocomplete')
+post_delete.connect(
+    update_autocomplete_on_translation_change,
+    sender=Vacancy._parler_meta.root_model,
+    dispatch_uid='vacancy_translation_delete_autocomplete')
+m2m_changed.connect(
+    update_autocomplete_on_categories_changed,
+    sender=Vacancy.categories.through,
+    dispatch_uid='vacancy_categories_update_autocomplete')
+
+
+def generate_static_files(namespaces):
+    """
+    Regenerates the sitemaps and the feeds of the given namespaces.
+    """
+    from .static_files import generate
+    generate(
+        VACANCIES_STATIC_FILES_DIR, use_gzip=VACANCIES_STATIC_FILES_GZIP,
+        namespaces=[namespace for namespace in namespaces if namespace])
+
+
+# Regenerates the static files at most once per transaction, in a thread
+# which coalesces the changes made while it is busy.
+pending_static_files = OnCommitBatch(
+    BackgroundQueue(generate_static_files).put)
+
+
+@receiver(pre_save, sender=Vacancy,
+          dispatch_uid='vacancy_static_files_remember_published')
+def remember_published_namespace(sender, instance, raw=False, **kwargs):
+    """
+    Remembers the namespace of the vacancy if it is published so far, as
+    unpublishing it or moving it to another section changes the static
+    files too.
+    """
+    if (VACANCIES_STATIC_FILES_ON_PUBLISH and VACANCIES_STATIC_FILES_DIR and
+            not raw and instance.pk):
+        published = list(Vacancy.objects.filter(
+            pk=instance.pk, is_published=True).values_list(
+            'app_config__namespace', flat=True)[:1])
+        instance._published_namespace = (
+            published[0] or '' if published else None)
+
+
+@receiver([post_save, post_delete], sender=Vacancy,
+          dispatch_uid='vacancy_generate_static_files')
+def generate_static_files_on_change(sender, instance, raw=False, **kwargs):
+    """
+    Queues the static files of the sections a published vacancy is or was
+    in. Drafts and unpublished vacancies do not show up in them.
+    """
+    if (not VACANCIES_STATIC_FILES_ON_PUBLISH or
+            not VACANCIES_STATIC_FILES_DIR or raw):
+        return
+    namespaces = []
+    if instance.is_published:
+        namespaces.append(
+            instance.app_config.namespace if instance.app_config_id else '')
+    if kwargs['signal'] is post_save:
+        previous = getattr(instance, '_published_namespace', None)
+        if previous is not None:
+            namespaces.append(previous)
+    if namespaces:
+        pending_static_files.add(*namespaces)
+
+
+@receiver(vacancies_updated, dispatch_uid='vacancies_updated_static_files')
+def generate_static_files_on_bulk_update(sender, namespaces, **kwargs):
+    if VACANCIES_STATIC_FILES_ON_PUBLISH and VACANCIES_STATIC_FILES_DIR:
+        pending_static_files.add(*namespaces)
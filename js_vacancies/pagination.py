@@ -0,0 +1,186 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import unicode_literals
+
+import base64
+import json
+
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Q
+from django.http import Http404
+from django.utils.dateparse import parse_datetime
+from django.utils.encoding import force_bytes, force_text
+from django.utils.functional import cached_property
+from django.utils.translation import ugettext as _
+
+from . import cache
+from .constants import VACANCIES_APPROXIMATE_COUNT_THRESHOLD
+
+
+def encode_cursor(obj, backwards=False):
+    value = '{0}|{1}|{2}'.format(
+        'p' if backwards else 'n', obj.publishing_date.isoformat(), obj.pk)
+    # The padding is dropped, so that the cursor is safe in query strings.
+    return force_text(base64.urlsafe_b64encode(force_bytes(value))).rstrip('=')
+
+
+def decode_cursor(cursor):
+    """
+    Returns a ((publishing_date, pk), backwards) tuple for the given cursor.
+    """
+    try:
+        cursor = force_bytes(cursor)
+        cursor += b'=' * (-len(cursor) % 4)
+        value = force_text(base64.urlsafe_b64decode(cursor))
+        direction, publishing_date, pk = value.split('|')
+        publishing_date = parse_datetime(publishing_date)
+        pk = int(pk)
+    except (TypeError, ValueError, UnicodeDecodeError):
+        publishing_date = None
+    if publishing_date is None or direction not in ('n', 'p'):
+        raise Http404(_('Invalid page.'))
+    return (publishing_date, pk), direction == 'p'
+
+
+class CursorPage(object):
+    """
+    A page of a CursorPaginator. Provides the parts of the Page API which do
+    not depend on the total number of objects.
+    """
+
+    def __init__(self, object_list, paginator, has_next, has_previous):
+        self.object_list = object_list
+        self.paginator = paginator
+        self._has_next = has_next
+        self._has_previous = has_previous
+
+    def __repr__(self):
+        return '<Page of {0} objects>'.format(len(self.object_list))
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_other_pages(self):
+        return self.has_previous() or self.has_next()
+
+    @property
+    def next_cursor(self):
+        if self.has_next() and self.object_list:
+            return encode_cursor(self.object_list[-1])
+        return None
+
+    @property
+    def previous_cursor(self):
+        if self.has_previous() and self.object_list:
+            return encode_cursor(self.object_list[0], backwards=True)
+        return None
+
+
+class CursorPaginator(object):
+    """
+    Keyset paginator over (publishing_date, pk), newest first. Every page is
+    a single indexed range query, however deep it is, and no count is
+    needed.
+    """
+
+    def __init__(self, object_list, per_page):
+        self.object_list = object_list
+        self.per_page = int(per_page)
+
+    def page(self, cursor=None):
+        queryset = self.object_list
+        if not cursor:
+            position, backwards = None, False
+        else:
+            position, backwards = decode_cursor(cursor)
+
+        if position is None:
+            queryset = queryset.order_by('-publishing_date', '-pk')
+        elif backwards:
+            publishing_date, pk = position
+            queryset = queryset.filter(
+                Q(publishing_date__gt=publishing_date) |
+                Q(publishing_date=publishing_date, pk__gt=pk)
+            ).order_by('publishing_date', 'pk')
+        else:
+            publishing_date, pk = position
+            queryset = queryset.filter(
+                Q(publishing_date__lt=publishing_date) |
+                Q(publishing_date=publishing_date, pk__lt=pk)
+            ).order_by('-publishing_date', '-pk')
+
+        object_list = list(queryset[:self.per_page + 1])
+        has_more = len(object_list) > self.per_page
+        object_list = object_list[:self.per_page]
+        if backwards:
+            object_list.reverse()
+            return CursorPage(object_list, self, True, has_more)
+        return CursorPage(object_list, self, has_more, position is not None)
+
+
+def estimate_count(queryset):
+    """
+    Returns the planner's row estimate for the queryset, or None when the
+    database cannot provide one cheaply.
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return None
+    sql, params = queryset.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute('EXPLAIN (FORMAT JSON) {0}'.format(sql), params)
+        plan = cursor.fetchone()[0]
+    if not isinstance(plan, (list, dict)):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+class CachedCountPaginator(Paginator):
+    """
+    A Paginator which caches the object count under ``count_key``, until
+    the published vacancies of ``count_namespace`` change. When
+    ``approximate_threshold`` is set, result sets estimated to be larger
+    than it are counted with the database's estimate instead.
+    """
+
+    def __init__(self, object_list, per_page, count_key=None,
+                 count_namespace=None,
+                 approximate_threshold=VACANCIES_APPROXIMATE_COUNT_THRESHOLD,
+                 **kwargs):
+        super(CachedCountPaginator, self).__init__(
+            object_list, per_page, **kwargs)
+        self.count_key = count_key
+        self.count_namespace = count_namespace
+        self.approximate_threshold = approximate_threshold
+
+    @cached_property
+    def count(self):
+        if self.count_key:
+            count = cache.get_cached(self.count_key)
+            if count is not None:
+                return count
+        count = self.get_count()
+        if self.count_key:
+            cache.set_cached(
+                self.count_key, count, namespace=self.count_namespace)
+        return count
+
+    def get_count(self):
+        if self.approximate_threshold:
+            estimate = estimate_count(self.object_list)
+            if estimate is not None and estimate >= self.approximate_threshold:
+                return estimate
+        return self.object_list.count()
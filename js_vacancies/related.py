@@ -0,0 +1,169 @@
+# -*- coding: utf-8 -*-
+"""
+Precomputed related vacancies.
+
+Two vacancies are related when they share categories, services or
+companies; the score is the weighted number of shared links. The best
+scoring neighbours of every vacancy are stored as ``RelatedVacancy`` rows,
+so that the detail view only needs one indexed lookup.
+
+Scores are symmetric, which allows updating the rankings of the other
+vacancies incrementally when a single vacancy changes.
+"""
+
+from __future__ import unicode_literals
+
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import Count, Min
+
+from .constants import VACANCIES_RELATED_COUNT, VACANCIES_RELATED_WEIGHTS
+from .utils import BackgroundQueue, OnCommitBatch
+
+RELATED_FIELDS = ('categories', 'services', 'companies')
+
+
+def get_related_models():
+    from .models import RelatedVacancy, Vacancy
+    return Vacancy, RelatedVacancy
+
+
+def get_link_fields(through):
+    """
+    Returns the names of the (vacancy, linked object) foreign keys of the
+    given M2M through model.
+    """
+    Vacancy, RelatedVacancy = get_related_models()
+    for field_name in RELATED_FIELDS:
+        field = Vacancy._meta.get_field(field_name)
+        if field.remote_field.through is through:
+            return field.m2m_field_name(), field.m2m_reverse_field_name()
+    raise ValueError('{0} is not a vacancy link model.'.format(through))
+
+
+def get_scores(pk):
+    """
+    Returns a Counter of {vacancy pk: score} for every published vacancy
+    sharing at least one link with the vacancy ``pk``.
+    """
+    Vacancy, RelatedVacancy = get_related_models()
+    scores = Counter()
+    for field_name in RELATED_FIELDS:
+        weight = VACANCIES_RELATED_WEIGHTS.get(field_name, 0)
+        if not weight:
+            continue
+        through = Vacancy._meta.get_field(field_name).remote_field.through
+        source, target = get_link_fields(through)
+        linked = through.objects.filter(
+            **{source: pk}).order_by().values(target)
+        rows = through.objects.filter(**{
+            '{0}__in'.format(target): linked,
+            '{0}__is_published'.format(source): True,
+        }).exclude(**{source: pk}).order_by().values_list(source).annotate(
+            shared=Count('pk'))
+        for other_pk, shared in rows:
+            scores[other_pk] += shared * weight
+    return scores
+
+
+def store_ranking(pk, scores):
+    Vacancy, RelatedVacancy = get_related_models()
+    RelatedVacancy.objects.filter(vacancy_id=pk).delete()
+    RelatedVacancy.objects.bulk_create([
+        RelatedVacancy(vacancy_id=pk, related_id=other_pk, score=score)
+        for other_pk, score in top(scores)
+    ])
+
+
+def top(scores, count=VACANCIES_RELATED_COUNT):
+    # Highest score first, newest vacancy (highest pk) on ties.
+    return sorted(
+        scores.items(), key=lambda item: (-item[1], -item[0]))[:count]
+
+
+def rebuild_related_vacancies(pk):
+    """
+    Recomputes the ranking of the vacancy ``pk`` from scratch.
+    """
+    with transaction.atomic():
+        store_ranking(pk, get_scores(pk))
+
+
+def update_related_vacancies(pk):
+    """
+    Recomputes the ranking of the vacancy ``pk`` and updates the rankings of
+    the vacancies it shares links with. Other rankings are only rebuilt from
+    scratch when the vacancy drops out of them (its score fell, or it was
+    unpublished), otherwise it is inserted or rescored in place. Those
+    rebuilds can be many for a vacancy with common links, so they are left
+    to a background thread once the transaction commits.
+    """
+    Vacancy, RelatedVacancy = get_related_models()
+    with transaction.atomic():
+        exists = Vacancy.objects.filter(pk=pk)
+        if not exists.exists():
+            return
+        published = exists.filter(is_published=True).exists()
+        scores = get_scores(pk)
+        store_ranking(pk, scores)
+
+        listed = dict(RelatedVacancy.objects.filter(
+            related_id=pk).values_list('vacancy_id', 'score'))
+        stale = set()
+        rescored = {}
+        for other_pk, old_score in listed.items():
+            new_score = scores.get(other_pk, 0)
+            if not published or new_score < old_score:
+                stale.add(other_pk)
+            elif new_score > old_score:
+                rescored.setdefault(new_score, []).append(other_pk)
+        for score, other_pks in rescored.items():
+            RelatedVacancy.objects.filter(
+                related_id=pk, vacancy_id__in=other_pks).update(score=score)
+
+        if published:
+            candidates = dict(
+                (other_pk, score) for other_pk, score in scores.items()
+                if other_pk not in listed)
+            stats = dict(
+                (row['vacancy_id'], (row['size'], row['lowest']))
+                for row in RelatedVacancy.objects.filter(
+                    vacancy_id__in=list(candidates)
+                ).order_by().values('vacancy_id').annotate(
+                    size=Count('pk'), lowest=Min('score')))
+            inserts = []
+            for other_pk, score in candidates.items():
+                size, lowest = stats.get(other_pk, (0, 0))
+                if size < VACANCIES_RELATED_COUNT or score > lowest:
+                    inserts.append(RelatedVacancy(
+                        vacancy_id=other_pk, related_id=pk, score=score))
+                    # Rankings are allowed to grow past their size, as the
+                    # lookups are ordered and sliced; trim the largest ones.
+                    if size + 1 >= 2 * VACANCIES_RELATED_COUNT:
+                        stale.add(other_pk)
+            RelatedVacancy.objects.bulk_create(inserts)
+
+        if stale:
+            background_rebuilds.add(*stale)
+
+
+def update_many(pks):
+    for pk in pks:
+        update_related_vacancies(pk)
+
+
+def rebuild_many(pks):
+    Vacancy, RelatedVacancy = get_related_models()
+    existing = Vacancy.objects.filter(pk__in=pks).values_list('pk', flat=True)
+    for pk in existing:
+        rebuild_related_vacancies(pk)
+
+
+pending_rebuilds = OnCommitBatch(rebuild_many)
+
+
+background_rebuilds = OnCommitBatch(BackgroundQueue(rebuild_many).put)
+
+
+pending_updates = OnCommitBatch(update_many)
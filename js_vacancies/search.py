@@ -0,0 +1,423 @@
+# -*- coding: utf-8 -*-
+"""
+Full-text search of vacancies without Haystack.
+
+A search backend indexes the title, lead_in and search_data of each
+vacancy translation and returns the pks of the matching vacancies, best
+match first. The backend is chosen with ``VACANCIES_FULLTEXT_BACKEND``:
+
+* ``'postgresql'``: a weighted ``tsvector`` column with a GIN index on the
+  translations table, stemmed with the text search configuration of the
+  language (see ``VACANCIES_FULLTEXT_CONFIGS``) and ranked by ``ts_rank``;
+* ``'sqlite'``: an FTS5 table ranked by ``bm25``. SQLite only ships an
+  English (porter) stemmer, which is used for all languages;
+* ``'memory'``: an in-process inverted index ranked by BM25, see
+  ``js_vacancies.inverted_index``;
+* ``'simple'``: ``icontains`` lookups, without ranking;
+* ``'auto'`` (default): the best backend available on the database.
+"""
+
+from __future__ import unicode_literals
+
+import re
+import threading
+from collections import OrderedDict
+
+from django.db import DatabaseError, connections, router
+from django.db.models import Case, IntegerField, Q, Value, When
+from django.utils.encoding import force_text
+from django.utils.timezone import now
+
+from .constants import (
+    VACANCIES_FULLTEXT_BACKEND,
+    VACANCIES_FULLTEXT_CONFIGS,
+    VACANCIES_SEARCH_CACHE_SIZE,
+    VACANCIES_SEARCH_MAX_RESULTS,
+)
+
+WORD_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def get_translation_model():
+    from .models import Vacancy
+    return Vacancy._parler_meta.root_model
+
+
+def get_words(query):
+    return WORD_RE.findall(force_text(query).lower())
+
+
+def normalize_query(query):
+    return ' '.join(force_text(query).lower().split())
+
+
+class SearchBackend(object):
+    """
+    Base class of the search backends.
+    """
+    name = None
+    vendor = None
+
+    def __init__(self, connection):
+        self.connection = connection
+
+    def is_available(self):
+        return self.connection.vendor == self.vendor
+
+    def search(self, query, language, namespace=None, scope=None,
+               limit=VACANCIES_SEARCH_MAX_RESULTS):
+        """
+        Returns the pks of the vacancies matching ``query`` in ``language``,
+        best match first. Only vacancies of ``scope`` (a Vacancy queryset,
+        by default the published vacancies of ``namespace``) are returned,
+        and the limit applies after scoping.
+        """
+        raise NotImplementedError
+
+    def get_scope(self, namespace=None, scope=None):
+        if scope is None:
+            from .models import Vacancy
+            scope = Vacancy.objects.published()
+            if namespace:
+                scope = scope.namespace(namespace)
+        return scope.order_by().values('pk')
+
+    def get_scope_sql(self, namespace=None, scope=None):
+        """
+        Returns the SQL (and params) selecting the pks of the scope, to
+        restrict a raw ranked query with.
+        """
+        query = self.get_scope(namespace, scope).query
+        return query.get_compiler(connection=self.connection).as_sql()
+
+    def install(self):
+        """
+        Creates the database structures of the backend.
+        """
+
+    def uninstall(self):
+        pass
+
+    def update(self, translation):
+        """
+        Updates the index of a (saved) vacancy translation.
+        """
+
+    def delete(self, translation):
+        pass
+
+    def rebuild(self):
+        """
+        Reindexes all vacancy translations.
+        """
+
+    def get_names(self):
+        model = get_translation_model()
+        quote = self.connection.ops.quote_name
+        names = dict(
+            (field, quote(model._meta.get_field(field).column))
+            for field in ('id', 'master', 'language_code', 'title', 'lead_in',
+                          'search_data'))
+        names['table'] = quote(model._meta.db_table)
+        return names
+
+    def execute(self, sql, params=None):
+        with self.connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            if cursor.description:
+                return cursor.fetchall()
+        return None
+
+
+class SimpleSearchBackend(SearchBackend):
+    name = 'simple'
+
+    def is_available(self):
+        return True
+
+    def search(self, query, language, namespace=None, scope=None,
+               limit=VACANCIES_SEARCH_MAX_RESULTS):
+        model = get_translation_model()
+        translations = model.objects.filter(
+            language_code=language,
+            master__in=self.get_scope(namespace, scope),
+        ).filter(
+            Q(title__icontains=query) |
+            Q(lead_in__icontains=query) |
+            Q(search_data__icontains=query)
+        ).order_by('-master__publishing_date')
+        return list(
+            translations.values_list('master_id', flat=True)[:limit])
+
+
+class PostgreSQLSearchBackend(SearchBackend):
+    name = 'postgresql'
+    vendor = 'postgresql'
+    column = 'search_vector'
+
+    def get_config(self, language):
+        language = (language or '').lower()
+        return VACANCIES_FULLTEXT_CONFIGS.get(
+            language, VACANCIES_FULLTEXT_CONFIGS.get(
+                language.split('-')[0], 'simple'))
+
+    def get_vector_sql(self):
+        # Titles weigh more than the summary, which weighs more than the
+        # rest of the content.
+        names = self.get_names()
+        return ' || '.join(
+            "setweight(to_tsvector(%s::regconfig, "
+            "coalesce({0}, '')), '{1}')".format(names[field], weight)
+            for field, weight in (
+                ('title', 'A'), ('lead_in', 'B'), ('search_data', 'C')))
+
+    def install(self):
+        names = self.get_names()
+        self.execute(
+            'ALTER TABLE {table} ADD COLUMN {column} tsvector'.format(
+                column=self.column, **names))
+        self.execute(
+            'CREATE INDEX {index} ON {table} USING GIN ({column})'.format(
+                index='js_vacancies_translation_search_vector',
+                column=self.column, **names))
+        self.rebuild()
+
+    def uninstall(self):
+        self.execute('ALTER TABLE {table} DROP COLUMN {column}'.format(
+            column=self.column, **self.get_names()))
+
+    def update(self, translation):
+        config = self.get_config(translation.language_code)
+        self.execute(
+            'UPDATE {table} SET {column} = {vector} WHERE {id} = %s'.format(
+                column=self.column, vector=self.get_vector_sql(),
+                **self.get_names()),
+            [config, config, config, translation.pk])
+
+    def rebuild(self):
+        names = self.get_names()
+        languages = self.execute(
+            'SELECT DISTINCT {language_code} FROM {table}'.format(**names))
+        for (language, ) in languages:
+            config = self.get_config(language)
+            self.execute(
+                'UPDATE {table} SET {column} = {vector} '
+                'WHERE {language_code} = %s'.format(
+                    column=self.column, vector=self.get_vector_sql(),
+                    **names),
+                [config, config, config, language])
+
+    def search(self, query, language, namespace=None, scope=None,
+               limit=VACANCIES_SEARCH_MAX_RESULTS):
+        scope_sql, scope_params = self.get_scope_sql(namespace, scope)
+        rows = self.execute(
+            'SELECT {master} FROM {table}, '
+            'plainto_tsquery(%s::regconfig, %s) AS search_query '
+            'WHERE {language_code} = %s AND {column} @@ search_query '
+            'AND {master} IN ({scope}) '
+            'ORDER BY ts_rank({column}, search_query) DESC LIMIT %s'.format(
+                column=self.column, scope=scope_sql, **self.get_names()),
+            [self.get_config(language), query, language] +
+            list(scope_params) + [limit])
+        return [row[0] for row in rows]
+
+
+class SQLiteSearchBackend(SearchBackend):
+    name = 'sqlite'
+    vendor = 'sqlite'
+    table = 'js_vacancies_vacancy_fts'
+    # {database alias: whether the FTS5 table exists}
+    installed = {}
+
+    def is_available(self):
+        if not super(SQLiteSearchBackend, self).is_available():
+            return False
+        alias = self.connection.alias
+        if alias not in self.installed:
+            self.installed[alias] = (
+                self.table in self.connection.introspection.table_names())
+        return self.installed[alias]
+
+    def install(self):
+        try:
+            self.execute(
+                'CREATE VIRTUAL TABLE {0} USING fts5('
+                'title, lead_in, search_data, '
+                'language_code UNINDEXED, master_id UNINDEXED, '
+                'tokenize = "porter unicode61")'.format(self.table))
+        except DatabaseError:
+            # SQLite was compiled without FTS5, use the simple backend.
+            return
+        self.installed[self.connection.alias] = True
+        self.rebuild()
+
+    def uninstall(self):
+        self.execute('DROP TABLE IF EXISTS {0}'.format(self.table))
+        self.installed.pop(self.connection.alias, None)
+
+    def update(self, translation):
+        self.delete(translation)
+        self.execute(
+            'INSERT INTO {0} (rowid, title, lead_in, search_data, '
+            'language_code, master_id) VALUES (%s, %s, %s, %s, %s, %s)'.format(
+                self.table),
+            [translation.pk, translation.title, translation.lead_in,
+             translation.search_data, translation.language_code,
+             translation.master_id])
+
+    def delete(self, translation):
+        self.execute(
+            'DELETE FROM {0} WHERE rowid = %s'.format(self.table),
+            [translation.pk])
+
+    def rebuild(self):
+        self.execute('DELETE FROM {0}'.format(self.table))
+        self.execute(
+            'INSERT INTO {fts} (rowid, title, lead_in, search_data, '
+            'language_code, master_id) '
+            'SELECT {id}, {title}, {lead_in}, {search_data}, '
+            '{language_code}, {master} FROM {table}'.format(
+                fts=self.table, **self.get_names()))
+
+    def search(self, query, language, namespace=None, scope=None,
+               limit=VACANCIES_SEARCH_MAX_RESULTS):
+        words = get_words(query)
+        if not words:
+            return []
+        # Quote every word, so that it is not parsed as FTS5 syntax.
+        match = ' '.join('"{0}"'.format(word) for word in words)
+        scope_sql, scope_params = self.get_scope_sql(namespace, scope)
+        rows = self.execute(
+            'SELECT master_id FROM {0} WHERE {0} MATCH %s '
+            'AND language_code = %s AND master_id IN ({1}) '
+            'ORDER BY bm25({0}, 10.0, 5.0, 1.0) LIMIT %s'.format(
+                self.table, scope_sql),
+            [match, language] + list(scope_params) + [limit])
+        return [row[0] for row in rows]
+
+
+class MemorySearchBackend(SearchBackend):
+    name = 'memory'
+
+    def is_available(self):
+        return True
+
+    def search(self, query, language, namespace=None, scope=None,
+               limit=VACANCIES_SEARCH_MAX_RESULTS):
+        from .inverted_index import get_index
+        if scope is None:
+            # The shards know which of their vacancies are published.
+            results = get_index().search(
+                query, language, namespace, limit, published=True)
+        else:
+            allowed = set(self.get_scope(namespace, scope).values_list(
+                'pk', flat=True))
+            results = get_index().search(
+                query, language, namespace, limit, allowed)
+        if results is None:
+            # The shard does not fit into memory.
+            return SimpleSearchBackend(self.connection).search(
+                query, language, namespace, scope, limit)
+        return results
+
+    def update(self, translation):
+        from .inverted_index import pending_updates
+        pending_updates.add(translation.master_id)
+
+    def delete(self, translation):
+        self.update(translation)
+
+
+BACKENDS = (
+    PostgreSQLSearchBackend,
+    SQLiteSearchBackend,
+    MemorySearchBackend,
+    SimpleSearchBackend,
+)
+
+
+def get_connection():
+    from .models import Vacancy
+    return connections[router.db_for_write(Vacancy)]
+
+
+def get_backend_class(connection, name=VACANCIES_FULLTEXT_BACKEND):
+    """
+    Returns the class of the configured backend for ``connection``.
+    """
+    for backend_class in BACKENDS:
+        if name == backend_class.name:
+            return backend_class
+        if name == 'auto' and backend_class.vendor == connection.vendor:
+            return backend_class
+    return SimpleSearchBackend
+
+
+def get_search_backend(connection=None):
+    """
+    Returns the configured search backend, or the simple backend if it is
+    not available.
+    """
+    if connection is None:
+        connection = get_connection()
+    backend = get_backend_class(connection)(connection)
+    if not backend.is_available():
+        backend = SimpleSearchBackend(connection)
+    return backend
+
+
+def search(query, language, namespace=None, scope=None):
+    """
+    Returns the pks of the vacancies of ``scope`` (by default the published
+    vacancies of ``namespace``) matching ``query``, best match first.
+    """
+    return get_search_backend().search(query, language, namespace, scope)
+
+
+def order_by_pks(queryset, pks):
+    """
+    Filters the queryset to the given pks, in the same order.
+    """
+    if not pks:
+        return queryset.none()
+    return queryset.filter(pk__in=pks).annotate(search_rank=Case(
+        *[When(pk=pk, then=Value(position))
+          for position, pk in enumerate(pks)],
+        output_field=IntegerField()
+    )).order_by('search_rank')
+
+
+class ResultCache(object):
+    """
+    An in-process LRU cache of search results. Entries are only valid for
+    the cache version they were computed with, and until the publish
+    transition following their computation.
+    """
+
+    def __init__(self, size=VACANCIES_SEARCH_CACHE_SIZE):
+        self.size = size
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key, version):
+        with self.lock:
+            entry = self.entries.pop(key, None)
+            if entry is None:
+                return None
+            entry_version, expires, pks = entry
+            if entry_version != version or (expires and expires <= now()):
+                return None
+            self.entries[key] = entry
+            return pks
+
+    def set(self, key, version, expires, pks):
+        if self.size <= 0:
+            return
+        with self.lock:
+            self.entries.pop(key, None)
+            self.entries[key] = (version, expires, pks)
+            while len(self.entries) > self.size:
+                self.entries.popitem(last=False)
+
+
+result_cache = ResultCache()
@@ -2,12 +2,14 @@
 from __future__ import unicode_literals
 
 from django.conf import settings
+from django.db.models import Q
+from django.utils.timezone import now
 
 from haystack.constants import DEFAULT_ALIAS
 
 from aldryn_search.utils import get_index_base
 
-from .models import Vacancy
+from .models import Vacancy, get_search_data
 
 
 class VacancyIndex(get_index_base()):
@@ -42,16 +44,64 @@ class VacancyIndex(get_index_base()):
 
     def get_index_queryset(self, language):
         queryset = super(VacancyIndex, self).get_index_queryset(language)
-        return queryset.published().language(language)
+        return queryset.published().open().language(language).for_indexing()
+
+    def get_updated_field(self):
+        return 'modified'
+
+    def build_queryset(self, using=None, start_date=None, end_date=None):
+        """
+        Besides the vacancies modified in the given period (update_index
+        --age), returns those published in it: they were not in the index
+        before, yet nobody modified them.
+        """
+        queryset = super(VacancyIndex, self).build_queryset(using=using)
+        if start_date or end_date:
+            modified = Q()
+            published = Q(publishing_date__lte=now())
+            if start_date:
+                modified &= Q(modified__gte=start_date)
+                published &= Q(publishing_date__gte=start_date)
+            if end_date:
+                modified &= Q(modified__lte=end_date)
+                published &= Q(publishing_date__lte=end_date)
+            queryset = queryset.filter(modified | published)
+        return queryset
 
     def get_model(self):
         return Vacancy
 
     def get_search_data(self, vacancy, language, request):
-        return vacancy.search_data
+        if vacancy.search_data:
+            return vacancy.search_data
+        return get_search_data([vacancy], language, request)[vacancy.pk]
 
     def should_update(self, instance, **kwargs):
         using = getattr(self, '_backend_alias', DEFAULT_ALIAS)
         language = self.get_current_language(using=using, obj=instance)
-        translations = instance.get_available_languages()
-        return translations.filter(language_code=language).exists()
+        return is_translated(instance, language)
+
+
+def is_translated(vacancy, language):
+    """
+    Returns whether the vacancy has a translation in ``language``, deciding
+    from its prefetched or cached translations where possible, so that
+    indexing a just saved vacancy needs no query. Otherwise the languages
+    are queried once per instance.
+    """
+    prefetched = getattr(vacancy, '_prefetched_objects_cache', {})
+    if 'translations' in prefetched:
+        return any(
+            translation.language_code == language
+            for translation in prefetched['translations'])
+    model = vacancy._parler_meta.root_model
+    cached = getattr(vacancy, '_translations_cache', {}).get(model, {})
+    if language in cached:
+        # Either a translation or parler's marker for a missing one.
+        translation = cached[language]
+        return isinstance(translation, model) and bool(translation.pk)
+    languages = getattr(vacancy, '_translated_languages', None)
+    if languages is None:
+        languages = vacancy._translated_languages = set(
+            vacancy.get_available_languages())
+    return language in languages
@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+"""
+A Haystack signal processor which indexes vacancies in batches.
+
+Enable it with::
+
+    HAYSTACK_SIGNAL_PROCESSOR = (
+        'js_vacancies.signal_processors.VacancySignalProcessor')
+
+Saves of vacancies and of their translations, as well as bulk updates
+(``vacancies_updated``), are collected until the transaction commits, then
+written with one update per backend alias (i.e. per language with
+aldryn_search) instead of one per vacancy, language and alias. Other models
+are indexed right away, like ``RealtimeSignalProcessor`` does.
+"""
+
+from __future__ import unicode_literals
+
+from django.db.models import signals
+from django.utils.translation import override
+
+from haystack.exceptions import NotHandled
+from haystack.signals import BaseSignalProcessor
+
+from .models import Vacancy
+from .signals import vacancies_updated
+from .utils import OnCommitBatch
+
+
+class VacancySignalProcessor(BaseSignalProcessor):
+
+    def setup(self):
+        self.pending = OnCommitBatch(self.update_vacancies)
+        signals.post_save.connect(self.handle_save)
+        signals.post_delete.connect(self.handle_delete)
+        vacancies_updated.connect(self.handle_vacancies_updated)
+
+    def teardown(self):
+        signals.post_save.disconnect(self.handle_save)
+        signals.post_delete.disconnect(self.handle_delete)
+        vacancies_updated.disconnect(self.handle_vacancies_updated)
+
+    def handle_save(self, sender, instance, **kwargs):
+        if sender is Vacancy:
+            self.pending.add(instance.pk)
+        elif sender is Vacancy._parler_meta.root_model:
+            self.pending.add(instance.master_id)
+        else:
+            super(VacancySignalProcessor, self).handle_save(
+                sender, instance, **kwargs)
+
+    def handle_delete(self, sender, instance, **kwargs):
+        if sender is Vacancy._parler_meta.root_model:
+            # The vacancy may still be indexed in other languages.
+            self.pending.add(instance.master_id)
+        else:
+            super(VacancySignalProcessor, self).handle_delete(
+                sender, instance, **kwargs)
+
+    def handle_vacancies_updated(self, sender, pks, **kwargs):
+        self.pending.add(*pks)
+
+    def update_vacancies(self, pks):
+        """
+        Reindexes the given vacancies with one write per backend alias, and
+        removes those which are no longer indexable from it.
+        """
+        for using in self.connection_router.for_write(model=Vacancy):
+            connection = self.connections[using]
+            try:
+                index = connection.get_unified_index().get_index(Vacancy)
+            except NotHandled:
+                continue
+            backend = connection.get_backend()
+            language = index.get_current_language(using=using)
+            with override(language):
+                vacancies = list(
+                    index.index_queryset(using=using).filter(pk__in=pks))
+                if vacancies:
+                    backend.update(index, vacancies)
+            indexed = set(vacancy.pk for vacancy in vacancies)
+            for pk in pks:
+                if pk not in indexed:
+                    backend.remove('{0}.{1}'.format(
+                        Vacancy._meta.label_lower, pk))
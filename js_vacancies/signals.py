@@ -0,0 +1,28 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import unicode_literals
+
+from django.dispatch import Signal
+
+# Sent when vacancies are changed in bulk (e.g. with QuerySet.update()), which
+# bypasses the usual post_save signal. ``pks`` is the list of changed
+# vacancies and ``namespaces`` the app_config namespaces they belong to.
+vacancies_updated = Signal(providing_args=['pks', 'namespaces'])
+
+# Sent when the cache of namespaces is invalidated in this process.
+# ``versions`` maps the namespaces (None for the version shared by all of
+# them) to their new cache version.
+cache_invalidated = Signal(providing_args=['versions'])
+
+
+def send_vacancies_updated(sender, queryset):
+    """
+    Sends ``vacancies_updated`` for all vacancies in ``queryset``.
+    """
+    rows = list(queryset.order_by().values_list(
+        'pk', 'app_config__namespace'))
+    if not rows:
+        return
+    pks = [pk for pk, namespace in rows]
+    namespaces = sorted(set(namespace for pk, namespace in rows))
+    vacancies_updated.send(sender=sender, pks=pks, namespaces=namespaces)
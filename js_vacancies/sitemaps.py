@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import unicode_literals
+
+from django.conf import settings
+from django.contrib.sitemaps import Sitemap
+from django.contrib.sites.models import Site
+
+from .constants import VACANCIES_SITEMAP_LIMIT
+from .models import Vacancy
+from .utils import get_vacancy_urls
+
+
+class VacanciesSitemap(Sitemap):
+    """
+    The published vacancies, optionally of one namespace and/or language.
+
+    Every page of the sitemap loads its vacancies in one chunk with all they
+    need for their URLs. There is one entry per vacancy and translation,
+    listing the other translations as hreflang alternates. Render it with
+    the ``js_vacancies/sitemap.xml`` template to include those::
+
+        url(r'^sitemap-vacancies\\.xml$', sitemap_views.sitemap, {
+            'sitemaps': {'vacancies': VacanciesSitemap()},
+            'template_name': 'js_vacancies/sitemap.xml',
+        }),
+
+    Large sitemaps are split into pages of at most ``VACANCIES_SITEMAP_LIMIT``
+    entries, to be listed by a sitemap index.
+    """
+    changefreq = "monthly"
+    priority = 0.7
+
+    def __init__(self, namespace=None, language=None, limit=None):
+        self.namespace = namespace
+        self.language = language
+        # Pages are of vacancies, which have up to one entry per language.
+        languages = 1 if language else len(self.get_languages())
+        self.limit = max(
+            1, (limit or VACANCIES_SITEMAP_LIMIT) // max(1, languages))
+
+    def get_languages(self):
+        return [code for code, name in settings.LANGUAGES]
+
+    def items(self):
+        qs = Vacancy.objects.published()
+        if self.namespace:
+            qs = qs.namespace(self.namespace)
+        if self.language:
+            qs = qs.translated(self.language)
+        return qs.for_listing().order_by('pk')
+
+    def lastmod(self, obj):
+        return max(obj.modified, obj.publishing_date)
+
+    def get_urls(self, page=1, site=None, protocol=None):
+        protocol = protocol or self.protocol or 'http'
+        if site is None:
+            site = Site.objects.get_current()
+        domain = '{0}://{1}'.format(protocol, site.domain)
+
+        vacancies = list(self.paginator.page(page).object_list)
+        languages = self.get_languages()
+        urls = dict(
+            (language, get_vacancy_urls(vacancies, language))
+            for language in languages)
+
+        entries = []
+        for vacancy in vacancies:
+            translated = set(
+                translation.language_code
+                for translation in vacancy.translations.all())
+            alternates = [
+                {'language': language,
+                 'location': domain + urls[language][vacancy.pk]}
+                for language in languages
+                if language in translated and vacancy.pk in urls[language]]
+            lastmod = self.lastmod(vacancy)
+            for alternate in alternates:
+                if self.language and alternate['language'] != self.language:
+                    continue
+                entries.append({
+                    'item': vacancy,
+                    'location': alternate['location'],
+                    'lastmod': lastmod,
+                    'changefreq': self.changefreq,
+                    'priority': str(self.priority),
+                    'alternates': alternates if len(alternates) > 1 else [],
+                })
+        if entries:
+            self.latest_lastmod = max(entry['lastmod'] for entry in entries)
+        return entries
@@ -0,0 +1,174 @@
+# -*- coding: utf-8 -*-
+"""
+Pre-generated sitemap and feed files, for the web server to serve without
+Django.
+
+``generate()`` writes, below the output directory:
+
+* ``sitemap-vacancies.xml``: a sitemap index of
+  ``sitemap-vacancies-<page>.xml``, rendered from ``VacanciesSitemap``;
+* ``feeds/<language>/<namespace>.rss``: the ``LatestVacanciesFeed`` of
+  every section (or of the given ``namespaces``), and with ``categories``
+  ``feeds/<language>/<namespace>/<category>.rss`` for every category.
+
+The index refers to the pages at ``VACANCIES_STATIC_FILES_URL``, where the
+output directory is expected to be served. Every file is written
+atomically, and with ``gzip`` also as a ``.gz`` next to it (for nginx's
+``gzip_static``). Feeds are rendered by calling their views with a request
+built for the apphooked page of the section, the way the CMS dispatches
+real requests to them.
+"""
+
+from __future__ import unicode_literals
+
+import gzip
+import io
+import os
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.contrib.sites.models import Site
+from django.template.loader import render_to_string
+from django.test import RequestFactory
+from django.utils.translation import override
+
+from cms.models import Page
+
+from .cms_appconfig import VacanciesConfig
+from .constants import VACANCIES_STATIC_FILES_URL
+from .sitemaps import VacanciesSitemap
+from .utils import write_atomically
+
+try:
+    from django.core.urlresolvers import NoReverseMatch, resolve, reverse
+except ImportError:
+    # Django 2.0
+    from django.urls import NoReverseMatch, resolve, reverse
+
+SITEMAP_NAME = 'sitemap-vacancies'
+
+
+def compress(data):
+    buffer = io.BytesIO()
+    with gzip.GzipFile(fileobj=buffer, mode='wb', mtime=0) as output:
+        output.write(data)
+    return buffer.getvalue()
+
+
+class Generator(object):
+
+    def __init__(self, output_dir, use_gzip=False, protocol='https',
+                 categories=False, namespaces=None):
+        self.output_dir = output_dir
+        self.use_gzip = use_gzip
+        self.protocol = protocol
+        self.categories = categories
+        self.namespaces = namespaces
+        self.site = Site.objects.get_current()
+        self.written = []
+
+    def write(self, name, data):
+        path = os.path.join(self.output_dir, name)
+        write_atomically(path, data)
+        if self.use_gzip:
+            write_atomically(path + '.gz', compress(data))
+        self.written.append(name)
+
+    def get_url(self, name):
+        url = VACANCIES_STATIC_FILES_URL + name
+        if '://' in url:
+            return url
+        return '{0}://{1}{2}'.format(self.protocol, self.site.domain, url)
+
+    def generate_sitemaps(self):
+        sitemap = VacanciesSitemap()
+        sitemap.protocol = self.protocol
+        locations = []
+        for page in sitemap.paginator.page_range:
+            name = '{0}-{1}.xml'.format(SITEMAP_NAME, page)
+            urlset = sitemap.get_urls(page=page, site=self.site)
+            content = render_to_string(
+                'js_vacancies/sitemap.xml', {'urlset': urlset})
+            self.write(name, content.encode('utf-8'))
+            locations.append(self.get_url(name))
+        content = render_to_string(
+            'sitemap_index.xml', {'sitemaps': locations})
+        self.write('{0}.xml'.format(SITEMAP_NAME), content.encode('utf-8'))
+
+    def get_feeds(self, namespace, language):
+        """
+        Yields the (file name, URL path) of the feeds of a section.
+        """
+        try:
+            path = reverse('{0}:vacancy-list-feed'.format(namespace))
+        except NoReverseMatch:
+            return
+        yield '{0}.rss'.format(namespace), path
+        if not self.categories:
+            return
+        from aldryn_categories.models import Category
+        categories = Category.objects.language(language).filter(
+            vacancy__app_config__namespace=namespace,
+            translations__language_code=language).distinct()
+        for category in categories:
+            slug = category.safe_translation_getter(
+                'slug', language_code=language)
+            try:
+                path = reverse(
+                    '{0}:vacancy-list-by-category-feed'.format(namespace),
+                    kwargs={'category': slug})
+            except NoReverseMatch:
+                continue
+            yield '{0}/{1}.rss'.format(namespace, slug), path
+
+    def get_pages(self):
+        """
+        Returns the published apphooked pages of the sections to generate
+        the feeds of, by namespace.
+        """
+        namespaces = VacanciesConfig.objects.values_list(
+            'namespace', flat=True)
+        if self.namespaces is not None:
+            namespaces = namespaces.filter(namespace__in=self.namespaces)
+        pages = Page.objects.public().filter(
+            application_namespace__in=list(namespaces))
+        return dict((page.application_namespace, page) for page in pages)
+
+    def render_feed(self, path, language, page):
+        request = RequestFactory().get(
+            path, secure=self.protocol == 'https',
+            HTTP_HOST=self.site.domain, HTTP_ACCEPT_LANGUAGE=language)
+        request.user = AnonymousUser()
+        request.current_page = page
+        request.LANGUAGE_CODE = language
+        match = resolve(request.path_info)
+        return match.func(request, *match.args, **match.kwargs)
+
+    def generate_feeds(self):
+        pages = self.get_pages()
+        for language, language_name in settings.LANGUAGES:
+            for namespace, page in sorted(pages.items()):
+                with override(language):
+                    for name, path in list(
+                            self.get_feeds(namespace, language)):
+                        response = self.render_feed(path, language, page)
+                        if response.status_code == 200:
+                            self.write(
+                                os.path.join('feeds', language, name),
+                                response.content)
+
+    def generate(self):
+        self.generate_sitemaps()
+        self.generate_feeds()
+        return self.written
+
+
+def generate(output_dir, use_gzip=False, protocol='https', categories=False,
+             namespaces=None):
+    """
+    Writes the sitemaps and the feeds (of all sections, or of the given
+    ``namespaces``) below ``output_dir``. Returns the names of the written
+    files.
+    """
+    return Generator(
+        output_dir, use_gzip, protocol, categories, namespaces).generate()
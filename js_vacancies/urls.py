@@ -3,7 +3,8 @@ from django.conf.urls import url
 from .views import (
     VacancyDetail, VacancyList, CategoryVacancyList,
     YearVacancyList, MonthVacancyList, DayVacancyList,
-    VacancySearchResultsList)
+    VacancySearchResultsList, FacetedVacancyList, VacancyAutocomplete,
+    VacancyExport)
 from .feeds import LatestVacanciesFeed, CategoryFeed
 
 urlpatterns = [
@@ -13,6 +14,14 @@ urlpatterns = [
 
     url(r'^search/$',
         VacancySearchResultsList.as_view(), name='vacancy-search'),
+    # Below a prefix which is not a valid slug, so that they cannot shadow
+    # the detail pages of vacancies slugged "autocomplete" or "filter".
+    url(r'^_/autocomplete/$',
+        VacancyAutocomplete.as_view(), name='vacancy-autocomplete'),
+    url(r'^_/filter/$',
+        FacetedVacancyList.as_view(), name='vacancy-list-filtered'),
+    url(r'^export\.(?P<format>jsonl|xml)$',
+        VacancyExport.as_view(), name='vacancy-export'),
 
     url(r'^(?P<year>\d{4})/$',
         YearVacancyList.as_view(), name='vacancy-list-by-year'),
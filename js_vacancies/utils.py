@@ -0,0 +1,263 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import unicode_literals
+
+import calendar
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+import weakref
+from collections import defaultdict
+
+from aldryn_newsblog.utils import get_plugin_index_data
+from cms.models.pluginmodel import CMSPlugin
+from cms.utils.i18n import get_current_language, get_redirect_on_fallback
+from cms.utils.plugins import downcast_plugins
+from django.conf import settings
+try:
+    from django.core.urlresolvers import (
+        NoReverseMatch, get_resolver, get_urlconf, reverse)
+except ImportError:
+    # Django 2.0
+    from django.urls import NoReverseMatch, get_resolver, get_urlconf, reverse
+from django.db import connections, transaction
+from django.utils.cache import get_conditional_response
+from django.utils.encoding import force_bytes, iri_to_uri
+from django.utils.http import http_date, quote_etag
+from django.utils.translation import override
+
+from . import cache
+
+try:
+    from queue import Queue
+except ImportError:
+    # Python 2
+    from Queue import Queue
+
+logger = logging.getLogger(__name__)
+
+# The permalink formats which urls.py can resolve, see get_vacancy_url().
+PERMALINK_FORMATS = ('s', 'ys', 'yms', 'ymds', 'ymdi')
+PERMALINK_KWARGS = (
+    ('y', 'year'), ('m', 'month'), ('d', 'day'), ('i', 'pk'), ('s', 'slug'))
+
+# {URL resolver: {(namespace, language): URL of the vacancy list}}
+_url_prefixes = weakref.WeakKeyDictionary()
+
+
+class OnCommitBatch(object):
+    """
+    Collects keys while a transaction is open and hands them, de-duplicated,
+    to ``callback`` once it commits. Outside of a transaction the callback
+    runs immediately.
+    """
+
+    def __init__(self, callback):
+        self.callback = callback
+        self.local = threading.local()
+
+    def add(self, *keys):
+        pending = getattr(self.local, 'pending', None)
+        if pending is None:
+            pending = self.local.pending = set()
+        pending.update(keys)
+        transaction.on_commit(self.flush)
+
+    def flush(self):
+        pending = getattr(self.local, 'pending', None)
+        if pending:
+            self.local.pending = None
+            self.callback(sorted(pending))
+
+
+class BackgroundQueue(object):
+    """
+    Hands keys to ``callback`` in a daemon thread. The keys queued while a
+    batch is being processed are coalesced into the next one.
+    """
+
+    def __init__(self, callback):
+        self.callback = callback
+        self.queue = Queue()
+        self.thread = None
+        self.lock = threading.Lock()
+
+    def put(self, keys):
+        self.queue.put(keys)
+        with self.lock:
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(target=self.run)
+                self.thread.daemon = True
+                self.thread.start()
+
+    def run(self):
+        while True:
+            pending = set(self.queue.get())
+            while not self.queue.empty():
+                pending.update(self.queue.get_nowait())
+            try:
+                self.callback(sorted(pending))
+            except Exception:
+                logger.exception('Processing %r failed.', sorted(pending))
+            finally:
+                # The thread's own database connections.
+                connections.close_all()
+
+
+def write_atomically(path, data):
+    """
+    Writes ``data`` (bytes) to ``path`` through a temporary file in the same
+    directory, so that readers never see a partially written file.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    if not os.path.isdir(directory):
+        os.makedirs(directory)
+    handle, temporary = tempfile.mkstemp(dir=directory)
+    try:
+        with os.fdopen(handle, 'wb') as output:
+            output.write(data)
+        os.chmod(temporary, 0o644)
+        os.rename(temporary, path)
+    except Exception:
+        os.remove(temporary)
+        raise
+
+
+def get_plugins_text(placeholder_ids, language, request):
+    """
+    Returns {placeholder pk: indexable text} of the plugins of the given
+    placeholders in ``language``. The plugins are downcast with one query
+    per plugin type, instead of one per plugin.
+    """
+    plugins = list(CMSPlugin.objects.filter(
+        placeholder__in=placeholder_ids,
+        language=language).order_by('placeholder', 'path'))
+    instances = dict(
+        (instance.pk, instance) for instance in downcast_plugins(plugins))
+    bits = defaultdict(list)
+    for plugin in plugins:
+        # Downcast instances are bound to themselves, get_plugin_index_data()
+        # does not query them again.
+        instance = instances.get(plugin.pk, plugin)
+        bits[plugin.placeholder_id].append(
+            ' '.join(get_plugin_index_data(instance, request)))
+    return dict((pk, ' '.join(texts)) for pk, texts in bits.items())
+
+
+def get_namespace_url_prefix(namespace, language):
+    """
+    Returns the URL of the vacancy list of ``namespace`` in ``language``,
+    which all vacancy permalinks of the namespace start with.
+
+    The prefixes are memoized per URL resolver: django CMS replaces the
+    resolver whenever apphooks are (re)attached, which drops the memo.
+    """
+    resolver = get_resolver(get_urlconf())
+    prefixes = _url_prefixes.setdefault(resolver, {})
+    key = (namespace, language)
+    if key not in prefixes:
+        if namespace:
+            view_name = '{0}:vacancy-list'.format(namespace)
+        else:
+            view_name = 'vacancy-list'
+        with override(language):
+            prefixes[key] = reverse(view_name)
+    return prefixes[key]
+
+
+def get_vacancy_url(vacancy, language=None):
+    """
+    Returns the url for the vacancy in the permalink format of its section,
+    without calling the URL resolver.
+    """
+    if not language:
+        language = get_current_language()
+    kwargs = {}
+    permalink_type = vacancy.app_config.permalink_type
+    if 'y' in permalink_type:
+        kwargs.update(year=vacancy.publishing_date.year)
+    if 'm' in permalink_type:
+        kwargs.update(month="%02d" % vacancy.publishing_date.month)
+    if 'd' in permalink_type:
+        kwargs.update(day="%02d" % vacancy.publishing_date.day)
+    if 'i' in permalink_type:
+        kwargs.update(pk=vacancy.pk)
+    if 's' in permalink_type:
+        slug, lang = vacancy.known_translation_getter(
+            'slug', default=None, language_code=language)
+        if slug and lang:
+            site_id = getattr(settings, 'SITE_ID', None)
+            if get_redirect_on_fallback(language, site_id):
+                language = lang
+            kwargs.update(slug=slug)
+
+    namespace = vacancy.app_config.namespace
+    url_format = ''.join(
+        letter for letter, kwarg in PERMALINK_KWARGS if kwarg in kwargs)
+    if url_format not in PERMALINK_FORMATS:
+        # Let the resolver decide (and complain).
+        view_name = 'vacancy-detail'
+        if namespace:
+            view_name = '{0}:{1}'.format(namespace, view_name)
+        with override(language):
+            return reverse(view_name, kwargs=kwargs)
+
+    prefix = get_namespace_url_prefix(namespace, language)
+    path = ''.join(
+        '{0}/'.format(kwargs[kwarg])
+        for letter, kwarg in PERMALINK_KWARGS if kwarg in kwargs)
+    return prefix + iri_to_uri(path)
+
+
+def get_vacancy_urls(vacancies, language=None):
+    """
+    Returns a {pk: url} dictionary with the urls of all given vacancies.
+    Vacancies which cannot be resolved (e.g. whose apphook is not attached
+    to a page in this language) are left out.
+    """
+    if not language:
+        language = get_current_language()
+    urls = {}
+    for vacancy in vacancies:
+        try:
+            urls[vacancy.pk] = get_vacancy_url(vacancy, language)
+        except NoReverseMatch:
+            pass
+    return urls
+
+
+def get_validators(namespace, last_modified, *parts):
+    """
+    Returns the (ETag, Last-Modified timestamp) validators of a response
+    showing vacancies of ``namespace`` which were last modified at
+    ``last_modified``. ``parts`` identify the response, e.g. its URL.
+    """
+    moments = [moment for moment in (
+        last_modified, cache.get_last_change(namespace)) if moment]
+    timestamp = None
+    if moments:
+        timestamp = calendar.timegm(max(moments).utctimetuple())
+    bits = [namespace, cache.get_version(namespace), timestamp]
+    bits.extend(parts)
+    etag = hashlib.md5(force_bytes(
+        ':'.join('{0}'.format(bit) for bit in bits))).hexdigest()
+    return quote_etag(etag), timestamp
+
+
+def get_not_modified_response(request, etag, timestamp, response=None):
+    """
+    Returns a 304 response if the request's conditional headers match the
+    validators, otherwise ``response``.
+    """
+    return get_conditional_response(
+        request, etag=etag, last_modified=timestamp, response=response)
+
+
+def set_validators(response, etag, timestamp):
+    if etag and not response.has_header('ETag'):
+        response['ETag'] = etag
+    if timestamp and not response.has_header('Last-Modified'):
+        response['Last-Modified'] = http_date(timestamp)
+    return response
@@ -5,17 +5,20 @@ from __future__ import unicode_literals
 from datetime import datetime, date
 from dateutil.relativedelta import relativedelta
 
-from django.contrib.sitemaps import Sitemap
-from django.db.models import Q
+from django.contrib.sites.shortcuts import get_current_site
 from django.db.models.functions import Lower
 from django.http import (
     Http404,
+    HttpResponse,
     HttpResponseRedirect,
     HttpResponsePermanentRedirect,
+    JsonResponse,
+    StreamingHttpResponse,
 )
 from django.shortcuts import get_object_or_404
 from django.utils import translation
-from django.views.generic import ListView
+from django.utils.http import parse_http_date_safe
+from django.views.generic import ListView, View
 from django.views.generic.detail import DetailView
 
 from menus.utils import set_language_changer
@@ -28,8 +31,25 @@ from aldryn_people.models import Person
 
 from aldryn_newsblog.utils.utilities import get_valid_languages_from_request
 from aldryn_newsblog.utils import add_prefix_to_path
+from . import autocomplete, cache, exports
 from .cms_appconfig import VacanciesConfig
+from .facets import (
+    filter_queryset,
+    get_facet_counts,
+    get_facet_filters,
+    mark_selected,
+)
+from .constants import (
+    VACANCIES_AUTOCOMPLETE_BUDGET,
+    VACANCIES_AUTOCOMPLETE_LIMIT,
+    VACANCIES_CACHE_RESPONSES,
+    VACANCIES_CACHE_RESPONSES_TIMEOUT,
+)
 from .models import Vacancy
+from .pagination import CachedCountPaginator, CursorPaginator
+from .search import normalize_query, order_by_pks, result_cache, search
+from .sitemaps import VacanciesSitemap  # NOQA
+from .utils import get_not_modified_response, get_validators, set_validators
 
 
 class TemplatePrefixMixin(object):
@@ -48,6 +68,121 @@ class TemplatePrefixMixin(object):
         return self.prefix_template_names(template_names)
 
 
+class CachedResponseMixin(object):
+    """
+    Caches the rendered response of anonymous GET requests outside of edit
+    mode, per namespace, language and URL (including the page), until a
+    vacancy or the section of the namespace changes. Must come after
+    AppConfigMixin.
+    """
+    cache_responses = VACANCIES_CACHE_RESPONSES
+    cache_responses_timeout = VACANCIES_CACHE_RESPONSES_TIMEOUT
+
+    def dispatch(self, request, *args, **kwargs):
+        if not self.is_response_cacheable(request):
+            return super(CachedResponseMixin, self).dispatch(
+                request, *args, **kwargs)
+
+        key = self.get_response_cache_key(request)
+        cached = cache.get_cached(key)
+        if cached is not None:
+            content, status, headers = cached
+            response = HttpResponse(content, status=status)
+            for header, value in headers:
+                response[header] = value
+            return get_not_modified_response(
+                request, response.get('ETag'),
+                parse_http_date_safe(response.get('Last-Modified')),
+                response=response)
+
+        response = super(CachedResponseMixin, self).dispatch(
+            request, *args, **kwargs)
+        if hasattr(response, 'add_post_render_callback'):
+            response.add_post_render_callback(
+                lambda response: self.cache_response(key, response))
+        else:
+            self.cache_response(key, response)
+        return response
+
+    def is_response_cacheable(self, request):
+        if not self.cache_responses or request.method not in ('GET', 'HEAD'):
+            return False
+        user = getattr(request, 'user', None)
+        if user is not None and user.is_authenticated:
+            return False
+        toolbar = getattr(request, 'toolbar', None)
+        return not (toolbar and toolbar.edit_mode)
+
+    def get_response_cache_key(self, request):
+        # Pages may contain absolute URLs, built from the host and scheme.
+        return cache.make_key(
+            'response', self.namespace, translation.get_language(),
+            request.get_host(), request.is_secure(), request.get_full_path(),
+            request.is_ajax())
+
+    def is_request_specific(self, request):
+        """
+        Whether rendering used the session or the messages of the visitor.
+        The session and messages middlewares only add their cookies and
+        ``Vary: Cookie`` after the response is cached, so it is checked on
+        the request. Looking up the (anonymous) user reads the session too,
+        which only matters if there is something in it.
+        """
+        session = getattr(request, 'session', None)
+        if session is not None and (session.modified or (
+                session.accessed and not session.is_empty())):
+            return True
+        messages = getattr(request, '_messages', None)
+        return bool(getattr(messages, 'used', False))
+
+    def cache_response(self, key, response):
+        if (response.status_code != 200 or response.streaming or
+                response.cookies or
+                self.request.META.get('CSRF_COOKIE_USED') or
+                self.is_request_specific(self.request)):
+            return
+        cache.set_cached(
+            key,
+            (response.content, response.status_code, list(response.items())),
+            namespace=self.namespace, timeout=self.cache_responses_timeout)
+
+
+class ConditionalGetMixin(object):
+    """
+    Answers conditional GET requests (If-None-Match / If-Modified-Since)
+    with 304 Not Modified, based on when the shown vacancies were last
+    modified. Must come after PreviewModeMixin.
+
+    Detail pages also list other vacancies of the namespace (neighbours,
+    related vacancies), so they are validated against the namespace too.
+    The next publish transition is part of the ETag, so that vacancies
+    closing or being published by themselves are noticed as well.
+    """
+
+    def get(self, request, *args, **kwargs):
+        if self.can_preview():
+            return super(ConditionalGetMixin, self).get(
+                request, *args, **kwargs)
+        etag, timestamp = get_validators(
+            self.namespace, self.get_last_modified(),
+            request.get_full_path(), translation.get_language(),
+            request.is_ajax(), cache.get_next_transition(self.namespace))
+        response = get_not_modified_response(request, etag, timestamp)
+        if response is None:
+            response = super(ConditionalGetMixin, self).get(
+                request, *args, **kwargs)
+        return set_validators(response, etag, timestamp)
+
+    def get_last_modified(self):
+        last_modified = self.get_queryset().last_modified()
+        if getattr(self, 'object', None) is not None:
+            dates = [self.object.modified, self.object.publishing_date]
+            if last_modified:
+                dates.append(last_modified)
+            return max(dates)
+        return last_modified
+
+
 class EditModeMixin(object):
     """
     A mixin which sets the property 'edit_mode' with the truth value for
@@ -68,17 +203,22 @@ class PreviewModeMixin(EditModeMixin):
     """
     def get_queryset(self):
         qs = super(PreviewModeMixin, self).get_queryset()
-        # check if user can see unpublished items. this will allow to switch
-        # to edit mode instead of 404 on vacancy detail page. CMS handles the
-        # permissions.
-        user = self.request.user
-        user_can_edit = user.is_staff or user.is_superuser
-        if not (self.edit_mode or user_can_edit):
+        if not self.can_preview():
             qs = qs.published()
         language = translation.get_language()
         qs = qs.active_translations(language).namespace(self.namespace)
         return qs
 
+    def can_preview(self):
+        """
+        Check if user can see unpublished items. This will allow to switch
+        to edit mode instead of 404 on vacancy detail page. CMS handles the
+        permissions.
+        """
+        user = self.request.user
+        user_can_edit = user.is_staff or user.is_superuser
+        return bool(self.edit_mode or user_can_edit)
+
 
 class AppHookCheckMixin(object):
 
@@ -98,8 +238,9 @@ class AppHookCheckMixin(object):
         return qs.translated(*self.valid_languages)
 
 
-class VacancyDetail(AppConfigMixin, AppHookCheckMixin, PreviewModeMixin,
-                    TranslatableSlugMixin, TemplatePrefixMixin, DetailView):
+class VacancyDetail(AppConfigMixin, CachedResponseMixin, AppHookCheckMixin,
+                    PreviewModeMixin, TranslatableSlugMixin,
+                    TemplatePrefixMixin, ConditionalGetMixin, DetailView):
     model = Vacancy
     slug_field = 'slug'
     year_url_kwarg = 'year'
@@ -154,29 +295,19 @@ class VacancyDetail(AppConfigMixin, AppHookCheckMixin, PreviewModeMixin,
 
     def get_context_data(self, **kwargs):
         context = super(VacancyDetail, self).get_context_data(**kwargs)
-        context['prev_vacancy'] = self.get_prev_object(
-            self.queryset, self.object)
-        context['next_vacancy'] = self.get_next_object(
-            self.queryset, self.object)
+        context['prev_vacancy'], context['next_vacancy'] = (
+            self.get_neighbours(self.object))
 
         vacancy = context['vacancy']
-        categories = vacancy.categories.all()
-        services = vacancy.services.all()
-        if categories or services:
-            ra_qs = Vacancy.objects.all().published().distinct()
-            if categories:
-                ra_qs = ra_qs.filter(categories__in=categories)
-            if services:
-                ra_qs = ra_qs.filter(services__in=services)
-            ra_qs = ra_qs.exclude(id=vacancy.id)
-            context['related_vacancies'] = ra_qs[:3]
+        context['related_vacancies'] = Vacancy.objects.published().related_to(
+            vacancy)[:3]
 
         related_types_first = vacancy.app_config
         if related_types_first is not None:
             context['related_types_first'] = related_types_first.namespace
         else:
             context['related_types_first'] = 'all'
-        related_categories_first = vacancy.categories.all().first()
+        related_categories_first = vacancy.categories.first()
         if related_categories_first is not None:
             context['related_categories_first'] = related_categories_first.slug
         else:
@@ -184,47 +315,55 @@ class VacancyDetail(AppConfigMixin, AppHookCheckMixin, PreviewModeMixin,
 
         return context
 
+    def get_neighbours(self, object):
+        """
+        Returns the previous and next vacancies of the detail queryset. The
+        pair is looked up in one query and then cached per namespace and
+        language, so subsequent hits only fetch the two objects.
+        """
+        queryset = self.get_queryset()
+        key = cache.make_key(
+            'neighbours', self.namespace, translation.get_language(),
+            self.can_preview(), object.pk)
+        pks = cache.get_cached(key)
+        if pks is None:
+            prev_obj, next_obj = queryset.neighbours(object)
+            cache.set_cached(key, (getattr(prev_obj, 'pk', None),
+                                   getattr(next_obj, 'pk', None)),
+                             namespace=self.namespace)
+            return prev_obj, next_obj
+        objects = queryset.in_bulk([pk for pk in pks if pk is not None])
+        return objects.get(pks[0]), objects.get(pks[1])
+
     def get_prev_object(self, queryset=None, object=None):
         if queryset is None:
             queryset = self.get_queryset()
         if object is None:
             object = self.get_object(self)
-        prev_objs = queryset.filter(
-            publishing_date__lt=object.publishing_date
-        ).order_by(
-            '-publishing_date'
-        )[:1]
-        if prev_objs:
-            return prev_objs[0]
-        else:
-            return None
+        return queryset.neighbours(object)[0]
 
     def get_next_object(self, queryset=None, object=None):
         if queryset is None:
             queryset = self.get_queryset()
         if object is None:
             object = self.get_object(self)
-        next_objs = queryset.filter(
-            publishing_date__gt=object.publishing_date
-        ).order_by(
-            'publishing_date'
-        )[:1]
-        if next_objs:
-            return next_objs[0]
-        else:
-            return None
+        return queryset.neighbours(object)[1]
 
 
-class VacancyListBase(AppConfigMixin, AppHookCheckMixin, TemplatePrefixMixin,
-        PreviewModeMixin, ViewUrlMixin, ListView):
+class VacancyListBase(AppConfigMixin, CachedResponseMixin, AppHookCheckMixin,
+        TemplatePrefixMixin, PreviewModeMixin, ViewUrlMixin,
+        ConditionalGetMixin, ListView):
     model = Vacancy
     show_header = False
+    paginator_class = CachedCountPaginator
+    # Query string parameters which do not filter the list.
+    pagination_params = ('page', 'cursor')
 
     def get_queryset(self):
         qs = super(VacancyListBase, self).get_queryset()
         if not self.edit_mode:
             qs = qs.published()
-        return qs
+        return qs.for_listing()
 
     def get_paginate_by(self, queryset):
         if self.paginate_by is not None:
@@ -235,6 +374,37 @@ class VacancyListBase(AppConfigMixin, AppHookCheckMixin, TemplatePrefixMixin,
             except AttributeError:
                 return 10  # sensible failsafe
 
+    def get_count_cache_key(self):
+        """
+        The list's count depends on the namespace, language, filters (the URL
+        and its query string) and whether unpublished vacancies are shown.
+        """
+        params = sorted(
+            (key, value) for key, value in self.request.GET.lists()
+            if key not in self.pagination_params)
+        return cache.make_key(
+            'count', self.namespace, translation.get_language(),
+            bool(self.edit_mode), self.request.path, params)
+
+    def get_paginator(self, queryset, per_page, orphans=0,
+                      allow_empty_first_page=True, **kwargs):
+        kwargs.setdefault('count_key', self.get_count_cache_key())
+        kwargs.setdefault('count_namespace', self.namespace)
+        return super(VacancyListBase, self).get_paginator(
+            queryset, per_page, orphans=orphans,
+            allow_empty_first_page=allow_empty_first_page, **kwargs)
+
+    def get_pagination_mode(self):
+        return getattr(self.config, 'pagination_mode', 'pages')
+
+    def paginate_queryset(self, queryset, page_size):
+        if self.get_pagination_mode() != 'cursor':
+            return super(VacancyListBase, self).paginate_queryset(
+                queryset, page_size)
+        paginator = CursorPaginator(queryset, page_size)
+        page = paginator.page(self.request.GET.get('cursor'))
+        return (paginator, page, page.object_list, page.has_other_pages())
+
     def get_pagination_options(self):
         # Django does not handle negative numbers well
         # when using variables.
@@ -250,6 +420,13 @@ class VacancyListBase(AppConfigMixin, AppHookCheckMixin, TemplatePrefixMixin,
                 'pages_visible': 4,
             }
 
+        options['cursor'] = self.get_pagination_mode() == 'cursor'
+        # Keep the list's filters (e.g. the search query) on page links.
+        params = self.request.GET.copy()
+        for param in self.pagination_params:
+            params.pop(param, None)
+        options['url_prefix'] = '?{0}'.format(
+            '{0}&'.format(params.urlencode()) if params else '')
         pages_visible_negative = -options['pages_visible']
         options['pages_visible_negative'] = pages_visible_negative
         options['pages_visible_total'] = options['pages_visible'] + 1
@@ -305,14 +482,50 @@ class VacancySearchResultsList(VacancyListBase):
         if not self.edit_mode:
             qs = qs.published()
         if self.query:
-            return qs.filter(
-                Q(translations__title__icontains=self.query) |
-                Q(translations__lead_in__icontains=self.query) |
-                Q(translations__search_data__icontains=self.query)
-            ).distinct()
+            return order_by_pks(qs, self.get_search_results())
         else:
             return qs.none()
 
+    def get_search_results(self):
+        """
+        Returns the pks of the matching vacancies the user may see, best
+        match first. They are cached in process per normalized query,
+        namespace, language and preview mode, until the vacancies of the
+        namespace change.
+        """
+        if not hasattr(self, '_search_results'):
+            query = normalize_query(self.query)
+            language = translation.get_language()
+            key = (query, self.namespace, language,
+                   self.can_preview(), bool(self.edit_mode))
+            version = cache.get_version(self.namespace)
+            pks = result_cache.get(key, version)
+            if pks is None:
+                qs = super(VacancySearchResultsList, self).get_queryset()
+                if not self.edit_mode:
+                    qs = qs.published()
+                # Outside of edit mode the default scope (the published
+                # vacancies of the namespace) is enough, as the results are
+                # filtered by qs anyway, and cheaper for some backends.
+                matches = order_by_pks(qs, search(
+                    query, language, self.namespace,
+                    scope=qs if self.edit_mode else None))
+                pks = []
+                seen = set()
+                for pk in matches.values_list('pk', flat=True):
+                    if pk not in seen:
+                        seen.add(pk)
+                        pks.append(pk)
+                result_cache.set(
+                    key, version, cache.get_next_transition(self.namespace),
+                    pks)
+            self._search_results = pks
+        return self._search_results
+
+    def get_pagination_mode(self):
+        # Results are ordered by relevance, not by publishing date.
+        return 'pages'
+
     def get_context_data(self, **kwargs):
         cxt = super(VacancySearchResultsList, self).get_context_data(**kwargs)
         cxt['query'] = self.query
@@ -326,6 +539,78 @@ class VacancySearchResultsList(VacancyListBase):
         return self.prefix_template_names(template_names)
 
 
+class VacancyAutocomplete(AppConfigMixin, View):
+    """
+    Returns suggestions of published vacancy titles, categories and
+    locations starting with the words of ``q`` as JSON.
+    """
+
+    def get(self, request, *args, **kwargs):
+        query = request.GET.get('q', '')
+        try:
+            limit = min(int(request.GET.get('limit', '')),
+                        VACANCIES_AUTOCOMPLETE_LIMIT)
+        except ValueError:
+            limit = VACANCIES_AUTOCOMPLETE_LIMIT
+        results = autocomplete.get_index().suggest(
+            query, translation.get_language(), self.namespace,
+            max(limit, 0), VACANCIES_AUTOCOMPLETE_BUDGET)
+        return JsonResponse({'query': query, 'results': results})
+
+
+class VacancyExport(AppConfigMixin, View):
+    """
+    Streams all open, published vacancies of the section in the current
+    language as JSON Lines or job-board XML, for syndication.
+    """
+
+    def get(self, request, format, *args, **kwargs):
+        response = StreamingHttpResponse(
+            exports.export(
+                format, self.namespace, translation.get_language(),
+                base_url=request.build_absolute_uri('/')[:-1],
+                publisher=get_current_site(request).name),
+            content_type=exports.CONTENT_TYPES[format])
+        return response
+
+
+class FacetedVacancyList(VacancyListBase):
+    """
+    A list of vacancies filtered by location, type, services, companies
+    and closing date, with the number of vacancies for each facet value.
+    """
+
+    def get(self, request, *args, **kwargs):
+        self.facet_filters = get_facet_filters(request.GET)
+        return super(FacetedVacancyList, self).get(request)
+
+    def get_queryset(self):
+        return filter_queryset(
+            super(FacetedVacancyList, self).get_queryset(),
+            self.facet_filters)
+
+    def get_facets(self):
+        """
+        Returns the facet counts, which are cached per namespace, language
+        and selection.
+        """
+        key = cache.make_key(
+            'facets', self.namespace, translation.get_language(),
+            bool(self.edit_mode), sorted(self.facet_filters.items()))
+        facets = cache.get_cached(key)
+        if facets is None:
+            facets = get_facet_counts(
+                super(FacetedVacancyList, self).get_queryset(),
+                self.facet_filters)
+            cache.set_cached(key, facets, namespace=self.namespace)
+        return mark_selected(facets, self.facet_filters)
+
+    def get_context_data(self, **kwargs):
+        kwargs['facets'] = self.get_facets()
+        kwargs['facet_filters'] = self.facet_filters
+        return super(FacetedVacancyList, self).get_context_data(**kwargs)
+
+
 class CategoryVacancyList(VacancyListBase):
     """A list of vacancies filtered by categories."""
     def get_queryset(self):
@@ -396,15 +681,3 @@ class DayVacancyList(DateRangeVacancyList):
             int(kwargs['year']), int(kwargs['month']), int(kwargs['day']))
         date_to = date_from + relativedelta(days=1)
         return date_from, date_to
-
-
-class VacanciesSitemap(Sitemap):
-    changefreq = "monthly"
-    priority = 0.7
-
-    def items(self):
-        return Vacancy.objects.all().filter(is_published=True).filter(
-            publishing_date__lte=datetime.now()).distinct()
-
-    def lastmod(self, obj):
-        return obj.publishing_date  # MOD date exists?  (e.g. when plugins are updated)